@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    wait,
+)
+from typing import Any, Iterable, Iterator, NamedTuple, Optional, TextIO
+
+from Board import STARTING_FEN, Board
+from Bot import (
+    CHECKMATE_SCORE,
+    MATE_THRESHOLD,
+    MAX_SEARCH_DEPTH,
+    Bot,
+    getWorkerTablebases,
+    getWorkerTranspositionTable,
+)
+from PGN import (
+    playVariation,
+    readGames,
+    replayMoves,
+    startingBoard,
+)
+
+DEFAULT_DEPTH = 4
+# Enough positions are queued to keep every worker busy without reading a
+# large input far ahead of the analysis.
+PENDING_PER_WORKER = 4
+
+
+class Position(NamedTuple):
+    id: str
+    fen: str
+    played: Optional[str] = None
+    error: Optional[str] = None
+
+
+class SearchLimits(NamedTuple):
+    depth: Optional[int]
+    timeLimit: Optional[float]
+    nodeLimit: Optional[int]
+    hashSizeMB: float
+    useBitboards: bool
+    tablebaseDirectory: Optional[str]
+
+
+# Positions are named by their line number, so a rerun over the same input
+# gives them the same ids.
+def readFenPositions(lines: Iterable[str]) -> Iterator[Position]:
+    for number, line in enumerate(lines, 1):
+        fen = line.split('#')[0].strip()
+        if fen:
+            yield Position(str(number), fen)
+
+
+# Every position a game's move was played from is analysed, named by game
+# number and ply. A game that cannot be replayed stops at the bad move.
+def readPgnPositions(lines: Iterable[str]) -> Iterator[Position]:
+    for gameNumber, game in enumerate(readGames(lines), 1):
+        ply = 1
+        fen = game.headers.get('FEN', STARTING_FEN)
+        try:
+            board = startingBoard(game)
+            for _ in replayMoves(board, game.moves):
+                fen = board.toFEN()
+                yield Position(
+                    '%d:%d' % (gameNumber, ply), fen, game.moves[ply - 1]
+                )
+                ply += 1
+        except ValueError as error:
+            yield Position('%d:%d' % (gameNumber, ply), fen, error=str(error))
+
+
+def getMateDistance(score: int) -> Optional[int]:
+    if score > MATE_THRESHOLD:
+        return (CHECKMATE_SCORE - score + 1) // 2
+    if score < -MATE_THRESHOLD:
+        return -((CHECKMATE_SCORE + score + 1) // 2)
+    return None
+
+
+def analysePosition(
+        position: Position, limits: SearchLimits
+) -> dict[str, Any]:
+    record: dict[str, Any] = {'id': position.id, 'fen': position.fen}
+    if position.played is not None:
+        record['played'] = position.played
+    try:
+        board = Board.fromFEN(position.fen, limits.useBitboards)
+    except ValueError as error:
+        record['error'] = str(error)
+        return record
+
+    bot = Bot(
+        board, board.currentSide, limits.depth or MAX_SEARCH_DEPTH,
+        hashSizeMB=0, timeLimit=limits.timeLimit,
+        nodeLimit=limits.nodeLimit,
+        tablebases=getWorkerTablebases(limits.tablebaseDirectory),
+    )
+    transpositionTable = getWorkerTranspositionTable(limits.hashSizeMB)
+    if transpositionTable is not None:
+        bot.transpositionTable = transpositionTable
+
+    start = time.perf_counter()
+    if board.getLegalMoves(board.currentSide):
+        bestMoves = bot.getBestMoves(maxDepth=limits.depth)
+        variation = bot.principalVariation or bestMoves[:1]
+        notations = playVariation(board, [move.code for move in variation])
+        for _ in notations:
+            board.undoLastMove()
+        score = bot.bestScore
+        record['bestMove'] = notations[0]
+        record['coordinate'] = board.getCoordinateNotationOfMove(
+            board.getMoveForCode(variation[0].code)
+        )
+    else:
+        notations = []
+        score = -CHECKMATE_SCORE if board.isInCheck(board.currentSide) else 0
+        record['bestMove'] = None
+        record['coordinate'] = None
+    record['score'] = score
+    record['mate'] = getMateDistance(score)
+    record['depth'] = bot.completedDepth
+    record['nodes'] = bot.movesAnalyzed
+    record['time'] = round(time.perf_counter() - start, 3)
+    record['pv'] = notations
+    return record
+
+
+# A crash can leave the last record half written. It is cut off, so the
+# records appended on resuming start on a line of their own.
+def loadFinishedIds(path: str) -> set[str]:
+    finished = set()
+    end = 0
+    with open(path, 'rb') as resultsFile:
+        for line in resultsFile:
+            if not line.endswith(b'\n'):
+                break
+            end += len(line)
+            try:
+                finished.add(json.loads(line)['id'])
+            except (ValueError, KeyError, TypeError):
+                continue
+    os.truncate(path, end)
+    return finished
+
+
+def writeRecord(output: TextIO, record: dict[str, Any]) -> None:
+    output.write(json.dumps(record) + '\n')
+    output.flush()
+
+
+def analysePositions(
+        positions: Iterable[Position], limits: SearchLimits, workers: int,
+        output: TextIO, finished: set[str]
+) -> tuple[int, int]:
+    analysed = skipped = 0
+    pending: set[Future] = set()
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        for position in positions:
+            if position.id in finished:
+                skipped += 1
+                continue
+            if position.error is not None:
+                writeRecord(output, {
+                    'id': position.id, 'fen': position.fen,
+                    'error': position.error,
+                })
+                continue
+            if len(pending) >= workers * PENDING_PER_WORKER:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    writeRecord(output, future.result())
+                    analysed += 1
+            pending.add(executor.submit(analysePosition, position, limits))
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                writeRecord(output, future.result())
+                analysed += 1
+    finally:
+        executor.shutdown(cancel_futures=True)
+    return analysed, skipped
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description='Analyse positions with Bot and write JSON Lines.'
+    )
+    parser.add_argument(
+        'input', help='FEN lines or a PGN file, or - to read stdin'
+    )
+    parser.add_argument(
+        '--format', choices=['fen', 'pgn'],
+        help='input format; guessed from the file name when left out',
+    )
+    parser.add_argument('--output', help='results file instead of stdout')
+    parser.add_argument(
+        '--resume', action='store_true',
+        help='skip positions already in the output file and append to it',
+    )
+    parser.add_argument(
+        '--depth', type=int,
+        help='search depth for each position (default %d unless --time or '
+        '--nodes is given)' % DEFAULT_DEPTH,
+    )
+    parser.add_argument(
+        '--time', type=float, help='seconds to search each position'
+    )
+    parser.add_argument(
+        '--nodes', type=int, help='nodes to search in each position'
+    )
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--hash', type=float, default=16, help='MB per worker')
+    parser.add_argument('--bitboards', action='store_true')
+    parser.add_argument('--tablebases', help='endgame tablebase directory')
+    args = parser.parse_args()
+
+    if args.resume and not args.output:
+        parser.error('--resume needs --output')
+    inputFormat = args.format
+    if inputFormat is None:
+        inputFormat = 'pgn' if args.input.lower().endswith('.pgn') else 'fen'
+    depth = args.depth
+    if depth is None and args.time is None and args.nodes is None:
+        depth = DEFAULT_DEPTH
+    limits = SearchLimits(
+        depth, args.time, args.nodes, args.hash, args.bitboards,
+        args.tablebases,
+    )
+
+    finished: set[str] = set()
+    if args.resume and os.path.exists(args.output):
+        finished = loadFinishedIds(args.output)
+    lines = (
+        sys.stdin if args.input == '-'
+        else open(args.input, errors='replace')
+    )
+    output = (
+        open(args.output, 'a' if args.resume else 'w')
+        if args.output else sys.stdout
+    )
+    if inputFormat == 'pgn':
+        positions = readPgnPositions(lines)
+    else:
+        positions = readFenPositions(lines)
+    start = time.perf_counter()
+    try:
+        analysed, skipped = analysePositions(
+            positions, limits, max(1, args.workers), output, finished
+        )
+    finally:
+        if lines is not sys.stdin:
+            lines.close()
+        if output is not sys.stdout:
+            output.close()
+    elapsed = time.perf_counter() - start
+    print(
+        'analysed %d  skipped %d  time %.3fs  positions/s %.2f' % (
+            analysed, skipped, elapsed, analysed / max(elapsed, 1e-9)
+        ),
+        file=sys.stderr,
+    )
+
+
+if __name__ == '__main__':
+    main()
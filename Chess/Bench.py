@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import argparse
+import time
+
+from Board import Board
+from Bot import Bot
+from Evaluation import EVALUATORS, Evaluator
+from Perft import REFERENCE_POSITIONS
+
+EVALUATION_REPEATS = 20
+
+
+def benchmarkWorkers(
+        fen: str, depth: int, workerCounts: list[int]
+) -> None:
+    baseline = None
+    for workers in workerCounts:
+        board = Board.fromFEN(fen, useBitboards=True)
+        bot = Bot(board, board.currentSide, depth, workers=workers)
+        try:
+            start = time.perf_counter()
+            bestMoves = bot.getBestMoves(maxDepth=depth)
+            elapsed = time.perf_counter() - start
+        finally:
+            bot.close()
+        if baseline is None:
+            baseline = elapsed
+        print(
+            'workers %2d  depth %d  nodes %9d  time %8.3fs  nps %9.0f  '
+            'speedup %5.2fx  best %s' % (
+                workers, depth, bot.movesAnalyzed, elapsed,
+                bot.movesAnalyzed / elapsed, baseline / elapsed,
+                ' '.join(
+                    sorted(
+                        board.getCoordinateNotationOfMove(move)
+                        for move in bestMoves
+                    )
+                ),
+            )
+        )
+
+
+def benchmarkNodes(depth: int) -> None:
+    for position in REFERENCE_POSITIONS:
+        board = Board.fromFEN(position.fen, useBitboards=True)
+        bot = Bot(board, board.currentSide, depth)
+        start = time.perf_counter()
+        bestMoves = bot.getBestMoves(maxDepth=depth)
+        elapsed = time.perf_counter() - start
+        print(
+            '%-16s depth %d  nodes %9d  time %8.3fs  best %s' % (
+                position.name, depth, bot.movesAnalyzed, elapsed,
+                ' '.join(
+                    sorted(
+                        board.getCoordinateNotationOfMove(move)
+                        for move in bestMoves
+                    )
+                ),
+            )
+        )
+
+
+def timeEvaluations(
+        board: Board, depth: int, evaluate: Evaluator
+) -> tuple[int, float]:
+    start = time.perf_counter()
+    for _ in range(EVALUATION_REPEATS):
+        evaluate(board, board.currentSide)
+    elapsed = time.perf_counter() - start
+    calls = EVALUATION_REPEATS
+    if depth > 0:
+        for move in board.getLegalMoves(board.currentSide):
+            board.makeMove(move)
+            childCalls, childElapsed = timeEvaluations(
+                board, depth - 1, evaluate
+            )
+            board.undoLastMove()
+            calls += childCalls
+            elapsed += childElapsed
+    return calls, elapsed
+
+
+def benchmarkEvaluation(fen: str, depth: int) -> None:
+    for name, evaluate in EVALUATORS.items():
+        board = Board.fromFEN(fen)
+        calls, elapsed = timeEvaluations(board, depth, evaluate)
+        print(
+            '%-12s  depth %d  evaluations %9d  time %8.3fs  per second %10.0f'
+            % (name, depth, calls, elapsed, calls / elapsed)
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmark Bot searches.')
+    parser.add_argument(
+        'depth', type=int, nargs='?',
+        help='search depth, or tree depth with --evaluation',
+    )
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument(
+        '--position',
+        choices=[position.name for position in REFERENCE_POSITIONS],
+        default='kiwipete',
+    )
+    source.add_argument('--fen')
+    parser.add_argument(
+        '--workers', type=int, nargs='+', default=[1, 2, 4, 8],
+        help='worker counts to compare',
+    )
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        '--evaluation', action='store_true',
+        help='time the leaf evaluations over the tree below the position',
+    )
+    mode.add_argument(
+        '--nodes', action='store_true',
+        help='report search nodes at DEPTH for every reference position',
+    )
+    args = parser.parse_args()
+
+    fen = args.fen
+    if fen is None:
+        fen = next(
+            p.fen for p in REFERENCE_POSITIONS if p.name == args.position
+        )
+    if args.nodes:
+        benchmarkNodes(args.depth if args.depth is not None else 4)
+    elif args.evaluation:
+        depth = args.depth if args.depth is not None else 2
+        benchmarkEvaluation(fen, depth)
+    else:
+        depth = args.depth if args.depth is not None else 4
+        benchmarkWorkers(fen, depth, args.workers)
+
+
+if __name__ == '__main__':
+    main()
@@ -14,6 +14,7 @@ BLACK = False
 
 
 class Bishop(Piece):
+    __slots__ = ()
     stringRep = 'B'
     value = 3
 
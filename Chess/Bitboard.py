@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Iterator
+
+from Coordinate import Coordinate as C
+from Move import ALL_MOVES, QUIET_MOVES, TACTICAL_MOVES, Move
+
+if TYPE_CHECKING:
+    from Board import Board
+    from Piece import Piece
+
+WHITE = True
+BLACK = False
+
+PAWN = 0
+KNIGHT = 1
+BISHOP = 2
+ROOK = 3
+QUEEN = 4
+KING = 5
+
+KIND_OF_REP = {
+    '▲': PAWN, 'N': KNIGHT, 'B': BISHOP, 'R': ROOK, 'Q': QUEEN, 'K': KING
+}
+
+POSITIONS = [C(square % 8, square // 8) for square in range(64)]
+
+
+def squareOf(pos: C) -> int:
+    return pos[1] * 8 + pos[0]
+
+
+def stepAttacks(square: int, movements: list[tuple[int, int]]) -> int:
+    x, y = POSITIONS[square]
+    attacks = 0
+    for dx, dy in movements:
+        if 0 <= x + dx <= 7 and 0 <= y + dy <= 7:
+            attacks |= 1 << ((y + dy) * 8 + x + dx)
+    return attacks
+
+
+KNIGHT_MOVEMENTS = [
+    (2, 1), (2, -1), (-2, 1), (-2, -1), (1, 2), (1, -2), (-1, -2), (-1, 2)
+]
+KING_MOVEMENTS = [
+    (0, 1), (0, -1), (1, 0), (-1, 0), (1, 1), (1, -1), (-1, 1), (-1, -1)
+]
+
+KNIGHT_ATTACKS = [stepAttacks(sq, KNIGHT_MOVEMENTS) for sq in range(64)]
+KING_ATTACKS = [stepAttacks(sq, KING_MOVEMENTS) for sq in range(64)]
+PAWN_ATTACKS = {
+    WHITE: [stepAttacks(sq, [(1, 1), (-1, 1)]) for sq in range(64)],
+    BLACK: [stepAttacks(sq, [(1, -1), (-1, -1)]) for sq in range(64)],
+}
+
+ROOK_DIRECTIONS = [(0, 1), (1, 0), (0, -1), (-1, 0)]
+BISHOP_DIRECTIONS = [(1, 1), (-1, 1), (1, -1), (-1, -1)]
+
+
+def rayFrom(square: int, dx: int, dy: int) -> int:
+    x, y = POSITIONS[square]
+    ray = 0
+    x += dx
+    y += dy
+    while 0 <= x <= 7 and 0 <= y <= 7:
+        ray |= 1 << (y * 8 + x)
+        x += dx
+        y += dy
+    return ray
+
+
+RAYS_BY_DIRECTION = {
+    (dx, dy): [rayFrom(sq, dx, dy) for sq in range(64)]
+    for dx, dy in ROOK_DIRECTIONS + BISHOP_DIRECTIONS
+}
+
+
+# Directions that increase the square index find their nearest blocker with
+# the lowest set bit, the others with the highest.
+def raysFrom(
+        square: int, directions: list[tuple[int, int]]
+) -> list[tuple[int, bool, list[int]]]:
+    return [
+        (
+            RAYS_BY_DIRECTION[(dx, dy)][square],
+            dy * 8 + dx > 0,
+            RAYS_BY_DIRECTION[(dx, dy)],
+        )
+        for dx, dy in directions
+    ]
+
+
+ROOK_RAYS = [raysFrom(sq, ROOK_DIRECTIONS) for sq in range(64)]
+BISHOP_RAYS = [raysFrom(sq, BISHOP_DIRECTIONS) for sq in range(64)]
+
+
+def slidingAttacks(
+        occupied: int, rays: list[tuple[int, bool, list[int]]]
+) -> int:
+    attacks = 0
+    for ray, positive, raysBeyond in rays:
+        blockers = ray & occupied
+        if blockers:
+            if positive:
+                blocker = (blockers & -blockers).bit_length() - 1
+            else:
+                blocker = blockers.bit_length() - 1
+            ray ^= raysBeyond[blocker]
+        attacks |= ray
+    return attacks
+
+
+def rookAttacks(square: int, occupied: int) -> int:
+    return slidingAttacks(occupied, ROOK_RAYS[square])
+
+
+def bishopAttacks(square: int, occupied: int) -> int:
+    return slidingAttacks(occupied, BISHOP_RAYS[square])
+
+
+class Bitboards:
+    def __init__(self) -> None:
+        self.pieces: list[list[int]] = [[0] * 6, [0] * 6]
+        self.occupancy: list[int] = [0, 0]
+
+    def addPiece(self, piece: Piece, square: int) -> None:
+        bit = 1 << square
+        self.pieces[piece.side][KIND_OF_REP[piece.stringRep]] |= bit
+        self.occupancy[piece.side] |= bit
+
+    def removePiece(self, piece: Piece, square: int) -> None:
+        mask = ~(1 << square)
+        self.pieces[piece.side][KIND_OF_REP[piece.stringRep]] &= mask
+        self.occupancy[piece.side] &= mask
+
+    def attacksFromSquare(
+            self, kind: int, side: bool, square: int, occupied: int
+    ) -> int:
+        if kind == KNIGHT:
+            return KNIGHT_ATTACKS[square]
+        if kind == KING:
+            return KING_ATTACKS[square]
+        if kind == PAWN:
+            return PAWN_ATTACKS[side][square]
+        if kind == BISHOP:
+            return bishopAttacks(square, occupied)
+        if kind == ROOK:
+            return rookAttacks(square, occupied)
+        return rookAttacks(square, occupied) | bishopAttacks(square, occupied)
+
+    def isSquareAttacked(self, square: int, bySide: bool) -> bool:
+        pieces = self.pieces[bySide]
+        if KNIGHT_ATTACKS[square] & pieces[KNIGHT]:
+            return True
+        if KING_ATTACKS[square] & pieces[KING]:
+            return True
+        if PAWN_ATTACKS[not bySide][square] & pieces[PAWN]:
+            return True
+        occupied = self.occupancy[WHITE] | self.occupancy[BLACK]
+        diagonals = pieces[BISHOP] | pieces[QUEEN]
+        if diagonals and bishopAttacks(square, occupied) & diagonals:
+            return True
+        lines = pieces[ROOK] | pieces[QUEEN]
+        if lines and rookAttacks(square, occupied) & lines:
+            return True
+        return False
+
+    def attackersOf(self, square: int, bySide: bool) -> int:
+        pieces = self.pieces[bySide]
+        occupied = self.occupancy[WHITE] | self.occupancy[BLACK]
+        diagonals = pieces[BISHOP] | pieces[QUEEN]
+        lines = pieces[ROOK] | pieces[QUEEN]
+        return (
+            KNIGHT_ATTACKS[square] & pieces[KNIGHT]
+            | KING_ATTACKS[square] & pieces[KING]
+            | PAWN_ATTACKS[not bySide][square] & pieces[PAWN]
+            | bishopAttacks(square, occupied) & diagonals
+            | rookAttacks(square, occupied) & lines
+        )
+
+    def getPossibleMoves(
+            self, board: Board, piece: Piece, kinds: int = ALL_MOVES
+    ) -> Iterator[Move]:
+        side = piece.side
+        square = squareOf(piece.position)
+        kind = KIND_OF_REP[piece.stringRep]
+        own = self.occupancy[side]
+        enemy = self.occupancy[not side]
+
+        if kind == PAWN:
+            yield from self.getPawnMoves(
+                board, piece, square, own | enemy, kinds
+            )
+            return
+
+        targets = self.attacksFromSquare(kind, side, square, own | enemy)
+        if kinds == TACTICAL_MOVES:
+            targets &= enemy
+        elif kinds == QUIET_MOVES:
+            targets &= ~(own | enemy)
+        else:
+            targets &= ~own
+        squares = board.squares
+        while targets:
+            bit = targets & -targets
+            targets ^= bit
+            target = bit.bit_length() - 1
+            yield Move(
+                piece, POSITIONS[target], pieceToCapture=squares[target]
+            )
+
+        if kind == KING and kinds != TACTICAL_MOVES:
+            yield from piece.getCastlingMoves()
+
+    def getPawnMoves(
+            self, board: Board, pawn: Piece, square: int, occupied: int,
+            kinds: int = ALL_MOVES
+    ) -> Iterator[Move]:
+        side = pawn.side
+        step = 8 if side == WHITE else -8
+        advanceOne = square + step
+        if 0 <= advanceOne < 64 and not occupied >> advanceOne & 1:
+            if advanceOne >= 56 or advanceOne < 8:
+                if kinds != QUIET_MOVES:
+                    yield from pawn.getPromotionMoves(POSITIONS[advanceOne])
+            elif kinds != TACTICAL_MOVES:
+                yield Move(pawn, POSITIONS[advanceOne])
+                advanceTwo = advanceOne + step
+                if (
+                        pawn.movesMade == 0 and 0 <= advanceTwo < 64
+                        and not occupied >> advanceTwo & 1
+                ):
+                    yield Move(pawn, POSITIONS[advanceTwo])
+
+        if kinds == QUIET_MOVES:
+            return
+        targets = PAWN_ATTACKS[side][square] & self.occupancy[not side]
+        squares = board.squares
+        while targets:
+            bit = targets & -targets
+            targets ^= bit
+            target = bit.bit_length() - 1
+            if target >= 56 or target < 8:
+                yield from pawn.getPromotionMoves(
+                    POSITIONS[target], squares[target]
+                )
+            else:
+                yield Move(
+                    pawn, POSITIONS[target], pieceToCapture=squares[target]
+                )
+
+        yield from pawn.getPassantMoves()
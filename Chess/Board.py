@@ -1,18 +1,30 @@
 from __future__ import annotations
 
-from typing import Optional
+from typing import Iterable, Iterator, NamedTuple, Optional
 
 from colored import attr, bg, fg
 
 from Bishop import Bishop
+from Bitboard import Bitboards
 from Coordinate import Coordinate as C
+from Evaluation import Evaluation
 from King import King
 from Knight import Knight
-from Move import Move
+from Move import ALL_MOVES, QUIET_MOVES, TACTICAL_MOVES, Move
 from Pawn import Pawn
 from Piece import Piece
 from Queen import Queen
 from Rook import Rook
+from Zobrist import (
+    BLACK_KINGSIDE,
+    BLACK_QUEENSIDE,
+    BLACK_TO_MOVE_KEY,
+    CASTLING_KEYS,
+    PASSANT_KEYS,
+    PIECE_KEYS,
+    WHITE_KINGSIDE,
+    WHITE_QUEENSIDE,
+)
 
 
 WHITE = True
@@ -21,6 +33,50 @@ BLACK_FG = """\x1b[38;5;241m"""
 WHITE_FG = """\x1b[38;5;15m"""
 NO_FG = """\x1b[0m"""
 
+LINE_DIRECTIONS = [(0, 1), (0, -1), (1, 0), (-1, 0)]
+DIAGONAL_DIRECTIONS = [(1, 1), (1, -1), (-1, 1), (-1, -1)]
+KNIGHT_MOVEMENTS = [
+    (2, 1), (2, -1), (-2, 1), (-2, -1), (1, 2), (1, -2), (-1, -2), (-1, 2)
+]
+KING_MOVEMENTS = LINE_DIRECTIONS + DIAGONAL_DIRECTIONS
+FIFTY_MOVE_PLIES = 100
+# Legal moves are kept for the positions this many plies back, which covers
+# the line a search is in without holding on to a whole game's moves.
+LEGAL_MOVES_CACHE_PLIES = 16
+
+PIECE_FOR_LETTER = {
+    'p': Pawn, 'n': Knight, 'b': Bishop, 'r': Rook, 'q': Queen, 'k': King
+}
+LETTER_FOR_REP = {
+    '▲': 'p', 'N': 'n', 'B': 'b', 'R': 'r', 'Q': 'q', 'K': 'k'
+}
+CASTLING_LETTERS = (
+    (WHITE_KINGSIDE, 'K', C(4, 0), C(7, 0)),
+    (WHITE_QUEENSIDE, 'Q', C(4, 0), C(0, 0)),
+    (BLACK_KINGSIDE, 'k', C(4, 7), C(7, 7)),
+    (BLACK_QUEENSIDE, 'q', C(4, 7), C(0, 7)),
+)
+FILE_LETTERS = 'abcdefgh'
+
+STARTING_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+MATE_IN_ONE_FEN = '6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1'
+CASTLE_BOARD_FEN = 'r3k2r/pppppppp/8/8/8/8/PPPPPPPP/R3K2R w KQkq - 0 1'
+PASSANT_FEN = '8/8/8/1Pp5/8/3k4/8/4K3 w - c6 0 1'
+PROMOTION_FEN = '8/1P6/8/8/8/3k4/8/4K3 w - - 0 1'
+
+
+# Each entry remembers the key and halfmove clock of the position the move
+# was played from, so undoing a move restores both and repetitions can be
+# found without replaying the game. Recent entries also keep that position's
+# legal moves.
+class HistoryEntry(NamedTuple):
+    move: Move
+    pieceTaken: Optional[Piece]
+    key: Optional[int]
+    halfmoveClock: int
+    legalMoves: dict[bool, tuple[Move, ...]]
+
+
 class Board:
     def __init__(
             self,
@@ -28,72 +84,239 @@ class Board:
             castleBoard: bool = False,
             passant: bool = False,
             promotion: bool = False,
+            useBitboards: bool = False,
+            verifyZobrist: bool = False,
+            fen: Optional[str] = None,
     ):
-        self.pieces: list[Piece] = []
-        self.history: list[tuple[Move, Optional[Piece]]] = []
-        self.points = 0
+        self.pieces: dict[Piece, None] = {}
+        self.squares: list[Optional[Piece]] = [None] * 64
+        self.kings: dict[bool, Piece] = {}
+        self.zobristKey = 0
+        self.verifyZobrist = verifyZobrist
+        self.bitboards: Optional[Bitboards] = (
+            Bitboards() if useBitboards else None
+        )
+        self.evaluation = Evaluation()
+        self.history: list[HistoryEntry] = []
+        # Legal moves of the current position only, by side. Moves refer to
+        # piece objects, and two pieces of a kind can swap squares without
+        # changing the key, so they are never looked up by key.
+        self.legalMovesCache: dict[bool, tuple[Move, ...]] = {}
         self.currentSide = WHITE
         self.movesMade = 0
+        self.halfmoveClock = 0
         self.checkmate = False
 
-        if not mateInOne and not castleBoard and not passant and not promotion:
-            self.pieces.extend(
-                [
-                    Rook(self, BLACK, C(0, 7)),
-                    Knight(self, BLACK, C(1, 7)),
-                    Bishop(self, BLACK, C(2, 7)),
-                    Queen(self, BLACK, C(3, 7)),
-                    King(self, BLACK, C(4, 7)),
-                    Bishop(self, BLACK, C(5, 7)),
-                    Knight(self, BLACK, C(6, 7)),
-                    Rook(self, BLACK, C(7, 7)),
-                ]
-            )
-            for x in range(8):
-                self.pieces.append(Pawn(self, BLACK, C(x, 6)))
-            for x in range(8):
-                self.pieces.append(Pawn(self, WHITE, C(x, 1)))
-            self.pieces.extend(
-                [
-                    Rook(self, WHITE, C(0, 0)),
-                    Knight(self, WHITE, C(1, 0)),
-                    Bishop(self, WHITE, C(2, 0)),
-                    Queen(self, WHITE, C(3, 0)),
-                    King(self, WHITE, C(4, 0)),
-                    Bishop(self, WHITE, C(5, 0)),
-                    Knight(self, WHITE, C(6, 0)),
-                    Rook(self, WHITE, C(7, 0)),
-                ]
+        if fen is None:
+            if mateInOne:
+                fen = MATE_IN_ONE_FEN
+            elif castleBoard:
+                fen = CASTLE_BOARD_FEN
+            elif promotion:
+                fen = PROMOTION_FEN
+            elif passant:
+                fen = PASSANT_FEN
+            else:
+                fen = STARTING_FEN
+        self.loadFEN(fen)
+
+    @classmethod
+    def fromFEN(cls, fen: str, useBitboards: bool = False) -> Board:
+        return cls(useBitboards=useBitboards, fen=fen)
+
+    def loadFEN(self, fen: str) -> None:
+        fields = fen.split()
+        if len(fields) not in (4, 6):
+            raise ValueError('FEN needs 4 or 6 fields: %r' % fen)
+        placement, side, castling, passant = fields[:4]
+        ranks = placement.split('/')
+        if len(ranks) != 8 or side not in ('w', 'b'):
+            raise ValueError('Invalid FEN: %r' % fen)
+        halfmoveClock, fullmoveNumber = 0, 1
+        if len(fields) == 6:
+            if not (fields[4].isdigit() and fields[5].isdigit()):
+                raise ValueError('Invalid move counters in FEN: %r' % fen)
+            halfmoveClock = int(fields[4])
+            fullmoveNumber = max(1, int(fields[5]))
+
+        pieces: list[Piece] = []
+        placed: dict[C, Piece] = {}
+        for rankIndex, rank in enumerate(ranks):
+            y = 7 - rankIndex
+            x = 0
+            for letter in rank:
+                if letter.isdigit():
+                    x += int(letter)
+                    continue
+                pieceClass = PIECE_FOR_LETTER.get(letter.lower())
+                if pieceClass is None or x > 7:
+                    raise ValueError('Invalid FEN rank %r' % rank)
+                pieceSide = WHITE if letter.isupper() else BLACK
+                piece = pieceClass(self, pieceSide, C(x, y))
+                # Only pawns on their starting rank keep the double push, and
+                # kings and rooks count as moved unless a castling right says
+                # otherwise.
+                if pieceClass is Pawn:
+                    startRank = 1 if pieceSide == WHITE else 6
+                    piece.movesMade = 0 if y == startRank else 1
+                elif pieceClass is King or pieceClass is Rook:
+                    piece.movesMade = 1
+                pieces.append(piece)
+                placed[piece.position] = piece
+                x += 1
+            if x != 8:
+                raise ValueError('Invalid FEN rank %r' % rank)
+
+        if castling != '-':
+            for right, letter, kingPos, rookPos in CASTLING_LETTERS:
+                if letter not in castling:
+                    continue
+                rookSide = letter.isupper()
+                king = placed.get(kingPos)
+                rook = placed.get(rookPos)
+                if (
+                        king and king.stringRep == 'K' and king.side == rookSide
+                        and rook and rook.stringRep == 'R'
+                        and rook.side == rookSide
+                ):
+                    king.movesMade = 0
+                    rook.movesMade = 0
+
+        self.pieces = dict.fromkeys(pieces)
+        self.history = []
+        self.currentSide = side == 'w'
+        self.movesMade = (
+            2 * (fullmoveNumber - 1) + (0 if self.currentSide else 1)
+        )
+        self.halfmoveClock = halfmoveClock
+        self.checkmate = False
+        if passant != '-':
+            if (
+                    len(passant) != 2 or passant[0] not in FILE_LETTERS
+                    or passant[1] not in '36'
+            ):
+                raise ValueError('Invalid en passant square %r' % passant)
+            x = FILE_LETTERS.index(passant[0])
+            y = int(passant[1]) - 1
+            direction = -1 if self.currentSide == WHITE else 1
+            pawn = placed.get(C(x, y + direction))
+            # The double push that made the target is put back into history,
+            # which is where en passant generation and hashing look for it.
+            if (
+                    pawn and pawn.stringRep == '▲'
+                    and pawn.side != self.currentSide
+            ):
+                lastMove = Move(pawn, pawn.position)
+                lastMove.oldPos = C(x, y - direction)
+                self.history.append(
+                    HistoryEntry(lastMove, None, None, 0, {})
+                )
+        self.indexPieces()
+
+    def toFEN(self) -> str:
+        rows = []
+        squares = self.squares
+        for y in range(7, -1, -1):
+            row = ''
+            empty = 0
+            for piece in squares[y * 8:y * 8 + 8]:
+                if piece is None:
+                    empty += 1
+                    continue
+                if empty:
+                    row += str(empty)
+                    empty = 0
+                letter = LETTER_FOR_REP[piece.stringRep]
+                row += letter.upper() if piece.side == WHITE else letter
+            if empty:
+                row += str(empty)
+            rows.append(row)
+
+        rights = self.castlingRights()
+        castling = ''.join(
+            letter for right, letter, kingPos, rookPos in CASTLING_LETTERS
+            if rights & right
+        ) or '-'
+        passant = '-'
+        passantFile = self.passantFile()
+        if passantFile >= 0:
+            passant = FILE_LETTERS[passantFile] + (
+                '6' if self.currentSide == WHITE else '3'
             )
+        return '%s %s %s %s %d %d' % (
+            '/'.join(rows), 'w' if self.currentSide == WHITE else 'b',
+            castling, passant, self.getHalfmoveClock(),
+            self.movesMade // 2 + 1,
+        )
 
-        elif promotion:
-            pawnToPromote = Pawn(self, WHITE, C(1, 6))
-            pawnToPromote.movesMade = 1
-            kingWhite = King(self, WHITE, C(4, 0))
-            kingBlack = King(self, BLACK, C(3, 2))
-            self.pieces.extend([pawnToPromote, kingWhite, kingBlack])
-
-        elif passant:
-            pawn = Pawn(self, WHITE, C(1, 4))
-            pawn2 = Pawn(self, BLACK, C(2, 6))
-            kingWhite = King(self, WHITE, C(4, 0))
-            kingBlack = King(self, BLACK, C(3, 2))
-            self.pieces.extend([pawn, pawn2, kingWhite, kingBlack])
-            self.history = []
-            self.currentSide = BLACK
-            self.points = 0
-            self.movesMade = 0
-            self.checkmate = False
-            firstMove = Move(pawn2, C(2, 4))
-            self.makeMove(firstMove)
-            self.currentSide = WHITE
-            return
+    def getHalfmoveClock(self) -> int:
+        return self.halfmoveClock
+
+    # Only positions since the last capture or pawn move can come back, and
+    # only every other one has the same side to move.
+    def countRepetitions(self) -> int:
+        history = self.history
+        count = 0
+        for pliesBack in range(
+                4, min(self.halfmoveClock, len(history)) + 1, 2
+        ):
+            if history[-pliesBack].key == self.zobristKey:
+                count += 1
+        return count
+
+    # The position at the last capture or pawn move, with the codes of the
+    # moves played since. Replaying them on a board loaded from the FEN gives
+    # it every earlier position that can still repeat.
+    def getReversibleHistory(self) -> tuple[str, list[int]]:
+        history = self.history
+        count = 0
+        while (
+                count < min(self.halfmoveClock, len(history))
+                and history[-count - 1].key is not None
+        ):
+            count += 1
+        moves = [entry.move for entry in history[len(history) - count:]]
+        for _ in moves:
+            self.undoLastMove()
+        fen = self.toFEN()
+        for move in moves:
+            self.makeMove(move)
+        return fen, [move.code for move in moves]
+
+    @classmethod
+    def fromReversibleHistory(
+            cls, fen: str, moveCodes: list[int], useBitboards: bool = False
+    ) -> Board:
+        board = cls.fromFEN(fen, useBitboards)
+        for code in moveCodes:
+            move = board.getMoveForCode(code)
+            if move is None:
+                raise ValueError('Illegal move code %d after %r' % (code, fen))
+            board.makeMove(move)
+        return board
+
+    def isRepetition(self) -> bool:
+        return self.countRepetitions() > 0
+
+    def isThreefoldRepetition(self) -> bool:
+        return self.countRepetitions() >= 2
+
+    def isFiftyMoveDraw(self) -> bool:
+        return self.halfmoveClock >= FIFTY_MOVE_PLIES
 
     def __str__(self) -> str:
         return self.wrapStringRep(self.makeUnicodeStringRep(self.pieces))
 
     def undoLastMove(self) -> None:
-        lastMove, pieceTaken = self.history.pop()
+        lastEntry = self.history[-1]
+        lastMove, pieceTaken = lastEntry.move, lastEntry.pieceTaken
+        castlingMayChange = self.moveMayChangeCastling(lastMove)
+        self.zobristKey ^= self.passantKey()
+        if castlingMayChange:
+            self.zobristKey ^= CASTLING_KEYS[self.castlingRights()]
+        self.history.pop()
+        self.halfmoveClock = lastEntry.halfmoveClock
+        self.legalMovesCache = lastEntry.legalMoves
 
         if lastMove.queensideCastle or lastMove.kingsideCastle:
             king = lastMove.piece
@@ -110,60 +333,128 @@ class Board:
             pawnMoved = lastMove.piece
             pawnTaken = pieceTaken
             if pawnTaken:
-                self.pieces.append(pawnTaken)
-                if pawnTaken.side == WHITE:
-                    self.points += 1
-                if pawnTaken.side == BLACK:
-                    self.points -= 1
+                self.addPieceToPosition(pawnTaken, pawnTaken.position)
+                self.pieces[pawnTaken] = None
             self.movePieceToPosition(pawnMoved, lastMove.oldPos)
             pawnMoved.movesMade -= 1
 
         elif lastMove.promotion:
             pawnPromoted = lastMove.piece
             promotedPiece = self.pieceAtPosition(lastMove.newPos)
-            self.pieces.remove(promotedPiece)
+            del self.pieces[promotedPiece]
+            self.removePieceFromPosition(promotedPiece)
             if pieceTaken:
-                if pieceTaken.side == WHITE:
-                    self.points += pieceTaken.value
-                if pieceTaken.side == BLACK:
-                    self.points -= pieceTaken.value
-                self.pieces.append(pieceTaken)
-            self.pieces.append(pawnPromoted)
-            if pawnPromoted.side == WHITE:
-                self.points -= promotedPiece.value - 1
-            elif pawnPromoted.side == BLACK:
-                self.points += promotedPiece.value - 1
+                self.addPieceToPosition(pieceTaken, lastMove.newPos)
+                self.pieces[pieceTaken] = None
+            self.addPieceToPosition(pawnPromoted, lastMove.oldPos)
+            self.pieces[pawnPromoted] = None
             pawnPromoted.movesMade -= 1
 
         else:
             pieceToMoveBack = lastMove.piece
             self.movePieceToPosition(pieceToMoveBack, lastMove.oldPos)
             if pieceTaken:
-                if pieceTaken.side == WHITE:
-                    self.points += pieceTaken.value
-                if pieceTaken.side == BLACK:
-                    self.points -= pieceTaken.value
                 self.addPieceToPosition(pieceTaken, lastMove.newPos)
-                self.pieces.append(pieceTaken)
+                self.pieces[pieceTaken] = None
             pieceToMoveBack.movesMade -= 1
 
+        self.movesMade -= 1
         self.currentSide = not self.currentSide
+        if castlingMayChange:
+            self.zobristKey ^= CASTLING_KEYS[self.castlingRights()]
+        self.zobristKey ^= self.passantKey() ^ BLACK_TO_MOVE_KEY
+        if self.verifyZobrist:
+            self.checkZobristKey()
 
     def isCheckmate(self) -> bool:
-       
-        if len(self.getAllMovesLegal(self.currentSide)) == 0:
-            for move in self.getAllMovesUnfiltered(not self.currentSide):
-                pieceToTake = move.pieceToCapture
-                if pieceToTake and pieceToTake.stringRep == 'K':
-                    return True
-        return False
+        return (
+            len(self.getLegalMoves(self.currentSide)) == 0
+            and self.isInCheck(self.currentSide)
+        )
 
     def isStalemate(self) -> bool:
         return (
-            len(self.getAllMovesLegal(self.currentSide)) == 0
-            and not self.isCheckmate()
+            len(self.getLegalMoves(self.currentSide)) == 0
+            and not self.isInCheck(self.currentSide)
         )
 
+    def isInCheck(self, side: bool) -> bool:
+        king = self.kings.get(side)
+        return king is not None and self.isSquareAttacked(
+            king.position, not side
+        )
+
+    def isSquareAttacked(self, square: C, bySide: bool) -> bool:
+        if self.bitboards is not None:
+            return self.bitboards.isSquareAttacked(
+                square[1] * 8 + square[0], bySide
+            )
+        for _ in self.iterateAttackersOf(square, bySide):
+            return True
+        return False
+
+    def attackersOf(self, square: C, bySide: bool) -> list[Piece]:
+        if self.bitboards is not None:
+            attackers = self.bitboards.attackersOf(
+                square[1] * 8 + square[0], bySide
+            )
+            pieces = []
+            while attackers:
+                bit = attackers & -attackers
+                attackers ^= bit
+                pieces.append(self.squares[bit.bit_length() - 1])
+            return pieces
+        return list(self.iterateAttackersOf(square, bySide))
+
+    def iterateAttackersOf(self, square: C, bySide: bool) -> Iterator[Piece]:
+        sx, sy = square
+        squares = self.squares
+
+        for directions, sliderReps in (
+                (LINE_DIRECTIONS, 'RQ'),
+                (DIAGONAL_DIRECTIONS, 'BQ'),
+        ):
+            for dx, dy in directions:
+                x = sx + dx
+                y = sy + dy
+                while 0 <= x <= 7 and 0 <= y <= 7:
+                    piece = squares[y * 8 + x]
+                    if piece is not None:
+                        if (
+                                piece.side == bySide
+                                and piece.stringRep in sliderReps
+                        ):
+                            yield piece
+                        break
+                    x += dx
+                    y += dy
+
+        for movements, stepRep in (
+                (KNIGHT_MOVEMENTS, 'N'),
+                (KING_MOVEMENTS, 'K'),
+        ):
+            for dx, dy in movements:
+                x = sx + dx
+                y = sy + dy
+                if 0 <= x <= 7 and 0 <= y <= 7:
+                    piece = squares[y * 8 + x]
+                    if (
+                            piece is not None and piece.side == bySide
+                            and piece.stringRep == stepRep
+                    ):
+                        yield piece
+
+        pawnY = sy - 1 if bySide == WHITE else sy + 1
+        if 0 <= pawnY <= 7:
+            for x in (sx - 1, sx + 1):
+                if 0 <= x <= 7:
+                    piece = squares[pawnY * 8 + x]
+                    if (
+                            piece is not None and piece.side == bySide
+                            and piece.stringRep == '▲'
+                    ):
+                        yield piece
+
     def noMatingMaterial(self) -> bool:
         if len(self.pieces) == 2:
             return True 
@@ -177,27 +468,32 @@ class Board:
    
     def getLastMove(self) -> Move: 
         if self.history:
-            return self.history[-1][0]
+            return self.history[-1].move
 
    
     def getLastPieceMoved(self) -> Piece: 
         if self.history:
-            return self.history[-1][0].piece
+            return self.history[-1].move.piece
 
-    def addMoveToHistory(self, move: Move) -> None:
-        pieceTaken = None
+    def addMoveToHistory(self, move: Move, key: int) -> None:
         if move.passant:
             pieceTaken = move.specialMovePiece
-            self.history.append((move, pieceTaken))
-            return
-        pieceTaken = move.pieceToCapture
-        if pieceTaken:
-            self.history.append((move, pieceTaken))
-            return
-
-        self.history.append((move, None))
+        else:
+            pieceTaken = move.pieceToCapture
+        self.history.append(
+            HistoryEntry(
+                move, pieceTaken, key, self.halfmoveClock,
+                self.legalMovesCache,
+            )
+        )
+        if len(self.history) > LEGAL_MOVES_CACHE_PLIES:
+            self.history[-LEGAL_MOVES_CACHE_PLIES - 1].legalMoves.clear()
+        if pieceTaken is not None or move.piece.stringRep == '▲':
+            self.halfmoveClock = 0
+        else:
+            self.halfmoveClock += 1
 
-    def makeUnicodeStringRep(self, pieces: list[Piece]) -> str:
+    def makeUnicodeStringRep(self, pieces: Iterable[Piece]) -> str:
         DISPLAY_LOOKUP = {
             'R': '♜',
             'N': '♞',
@@ -235,9 +531,6 @@ class Board:
         ).rstrip()
         return sRep
 
-    def rankOfPiece(self, piece: Piece) -> str:
-        return str(piece.position[1] + 1)
-
     def fileOfPiece(self, piece: Piece) -> str:
         transTable = str.maketrans('01234567', 'abcdefgh')
         return str(piece.position[0]).translate(transTable)
@@ -248,124 +541,12 @@ class Board:
         notation += self.positionToHumanCoord(move.newPos)
 
         if move.promotion:
-            notation += str(
-                move.specialMovePiece.stringRep 
-            )
-        return notation
-
-    def getCaptureNotation(self, move: Move, short: bool = True) -> str:
-        notation = ''
-        pieceToMove = move.piece
-        pieceToTake = move.pieceToCapture
-
-        if type(pieceToMove) is Pawn:
-            notation += self.fileOfPiece(pieceToMove)
-        else:
-            notation += pieceToMove.stringRep
-        notation += 'x'
-        if short:
-            notation += pieceToTake.stringRep 
-        else:
-            notation += self.positionToHumanCoord(move.newPos)
-
-        if move.promotion:
-            notation += str(
-                move.specialMovePiece.stringRep  
-            )
+            notation += move.promotion.stringRep
         return notation
 
     def currentSideRep(self) -> str:
         return 'White' if self.currentSide else 'Black'
 
-    def getAlgebraicNotationOfMove(
-            self, move: Move, short: bool = True
-    ) -> str:
-        notation = ''
-        pieceToMove = move.piece
-        pieceToTake = move.pieceToCapture
-
-        if move.queensideCastle:
-            return '0-0-0'
-
-        if move.kingsideCastle:
-            return '0-0'
-
-        if not short or type(pieceToMove) is not Pawn:
-            notation += pieceToMove.stringRep
-
-        if pieceToTake is not None:
-            if short and type(pieceToMove) is Pawn:
-                notation += self.fileOfPiece(pieceToMove)
-            notation += 'x'
-
-        notation += self.positionToHumanCoord(move.newPos)
-
-        if move.promotion:
-            notation += '=' + str(
-                move.specialMovePiece.stringRep  
-            )
-
-        return notation
-
-    def getAlgebraicNotationOfMoveWithFile(
-            self, move: Move, short: bool = True
-    ) -> str:
-       
-        notation = ''
-        pieceToMove = self.pieceAtPosition(move.oldPos)
-        pieceToTake = self.pieceAtPosition(move.newPos)
-
-        if not short or type(pieceToMove) is not Pawn:
-            notation += pieceToMove.stringRep
-        notation += self.fileOfPiece(pieceToMove)
-
-        if pieceToTake is not None:
-            notation += 'x'
-
-        notation += self.positionToHumanCoord(move.newPos)
-        return notation
-
-    def getAlgebraicNotationOfMoveWithRank(
-            self, move: Move, short: bool = True
-    ) -> str:
-       
-        notation = ''
-        pieceToMove = self.pieceAtPosition(move.oldPos)
-        pieceToTake = self.pieceAtPosition(move.newPos)
-
-        if not short or type(pieceToMove) is not Pawn:
-            notation += pieceToMove.stringRep
-
-        notation += self.rankOfPiece(pieceToMove)
-
-        if pieceToTake is not None:
-            if short and type(pieceToMove) is Pawn:
-                notation += self.fileOfPiece(pieceToMove)
-            notation += 'x'
-
-        notation += self.positionToHumanCoord(move.newPos)
-        return notation
-
-    def getAlgebraicNotationOfMoveWithFileAndRank(
-            self, move: Move, short: bool = True
-    ) -> str:
-       
-        notation = ''
-        pieceToMove = self.pieceAtPosition(move.oldPos)
-        pieceToTake = self.pieceAtPosition(move.newPos)
-
-        if not short or type(pieceToMove) is not Pawn:
-            notation += pieceToMove.stringRep
-
-        notation += self.fileOfPiece(pieceToMove)
-        notation += self.rankOfPiece(pieceToMove)
-
-        if pieceToTake is not None:
-            notation += 'x'
-
-        notation += self.positionToHumanCoord(move.newPos)
-        return notation
-
     def positionToHumanCoord(self, pos: C) -> str:
         transTable = str.maketrans('01234567', 'abcdefgh')
         notation = str(pos[0]).translate(transTable) + str(pos[1] + 1)
@@ -379,18 +560,129 @@ class Board:
 
    
     def pieceAtPosition(self, pos: C) -> Piece: 
+        x, y = pos
+        if 0 <= x <= 7 and 0 <= y <= 7:
+            return self.squares[y * 8 + x]
+
+    def indexPieces(self) -> None:
+        self.squares = [None] * 64
+        self.kings = {}
+        if self.bitboards is not None:
+            self.bitboards = Bitboards()
+        self.evaluation = Evaluation()
+        self.zobristKey = 0
+        self.legalMovesCache = {}
         for piece in self.pieces:
-            if piece.position == pos:
-                return piece
+            self.addPieceToPosition(piece, piece.position)
+        self.zobristKey ^= self.stateKey()
+
+    def castlingRights(self) -> int:
+        rights = 0
+        for side, kingside, queenside in (
+                (WHITE, WHITE_KINGSIDE, WHITE_QUEENSIDE),
+                (BLACK, BLACK_KINGSIDE, BLACK_QUEENSIDE),
+        ):
+            king = self.kings.get(side)
+            if king is None or king.movesMade != 0:
+                continue
+            x, y = king.position
+            if x + 3 <= 7:
+                rook = self.squares[y * 8 + x + 3]
+                if (
+                        rook and rook.stringRep == 'R' and rook.side == side
+                        and rook.movesMade == 0
+                ):
+                    rights |= kingside
+            if x - 4 >= 0:
+                rook = self.squares[y * 8 + x - 4]
+                if (
+                        rook and rook.stringRep == 'R' and rook.side == side
+                        and rook.movesMade == 0
+                ):
+                    rights |= queenside
+        return rights
+
+    def passantFile(self) -> int:
+        lastMove = self.getLastMove()
+        if (
+                not lastMove or lastMove.piece.stringRep != '▲'
+                or abs(lastMove.newPos[1] - lastMove.oldPos[1]) != 2
+        ):
+            return -1
+        x, y = lastMove.newPos
+        for besideX in (x - 1, x + 1):
+            if 0 <= besideX <= 7:
+                piece = self.squares[y * 8 + besideX]
+                if (
+                        piece and piece.stringRep == '▲'
+                        and piece.side != lastMove.piece.side
+                ):
+                    return x
+        return -1
+
+    def passantKey(self) -> int:
+        passantFile = self.passantFile()
+        return PASSANT_KEYS[passantFile] if passantFile >= 0 else 0
+
+    def stateKey(self) -> int:
+        key = CASTLING_KEYS[self.castlingRights()] ^ self.passantKey()
+        if self.currentSide == BLACK:
+            key ^= BLACK_TO_MOVE_KEY
+        return key
+
+    def moveMayChangeCastling(self, move: Move) -> bool:
+        pieceTaken = move.pieceToCapture
+        return move.piece.stringRep in 'KR' or (
+            pieceTaken is not None and pieceTaken.stringRep == 'R'
+        )
+
+    def computeZobristKey(self) -> int:
+        key = self.stateKey()
+        for piece in self.pieces:
+            x, y = piece.position
+            key ^= PIECE_KEYS[piece.side][piece.stringRep][y * 8 + x]
+        return key
+
+    def checkZobristKey(self) -> None:
+        expectedKey = self.computeZobristKey()
+        assert self.zobristKey == expectedKey, (
+            'Zobrist key %016x does not match recomputed key %016x'
+            % (self.zobristKey, expectedKey)
+        )
 
     def movePieceToPosition(self, piece: Piece, pos: C) -> None:
-        piece.position = pos
+        self.removePieceFromPosition(piece)
+        self.addPieceToPosition(piece, pos)
 
     def addPieceToPosition(self, piece: Piece, pos: C) -> None:
         piece.position = pos
+        index = pos[1] * 8 + pos[0]
+        self.squares[index] = piece
+        self.zobristKey ^= PIECE_KEYS[piece.side][piece.stringRep][index]
+        if piece.stringRep == 'K':
+            self.kings[piece.side] = piece
+        self.evaluation.addPiece(piece, index)
+        if self.bitboards is not None:
+            self.bitboards.addPiece(piece, index)
+
+    def removePieceFromPosition(self, piece: Piece) -> None:
+        pos = piece.position
+        index = pos[1] * 8 + pos[0]
+        if self.squares[index] is piece:
+            self.squares[index] = None
+            self.zobristKey ^= PIECE_KEYS[piece.side][piece.stringRep][index]
+            self.evaluation.removePiece(piece, index)
+            if self.bitboards is not None:
+                self.bitboards.removePiece(piece, index)
 
     def makeMove(self, move: Move) -> None:
-        self.addMoveToHistory(move)
+        key = self.zobristKey
+        castlingMayChange = self.moveMayChangeCastling(move)
+        self.zobristKey ^= self.passantKey()
+        if castlingMayChange:
+            self.zobristKey ^= CASTLING_KEYS[self.castlingRights()]
+        self.addMoveToHistory(move, key)
+        self.legalMovesCache = {}
         if move.kingsideCastle or move.queensideCastle:
             kingToMove = move.piece
             rookToMove = move.specialMovePiece
@@ -406,25 +698,23 @@ class Board:
             pawnToMove = move.piece
            
             pawnToTake = move.specialMovePiece
-            pawnToMove.position = move.newPos
-            self.pieces.remove(pawnToTake) 
+            self.movePieceToPosition(pawnToMove, move.newPos)
+            del self.pieces[pawnToTake]
+            self.removePieceFromPosition(pawnToTake)
             pawnToMove.movesMade += 1
 
         elif move.promotion:
             pieceToTake = move.pieceToCapture
-            self.pieces.remove(move.piece)
+            del self.pieces[move.piece]
+            self.removePieceFromPosition(move.piece)
             if pieceToTake:
-                if pieceToTake.side == WHITE:
-                    self.points -= pieceToTake.value
-                if pieceToTake.side == BLACK:
-                    self.points += pieceToTake.value
-                self.pieces.remove(pieceToTake)
+                del self.pieces[pieceToTake]
+                self.removePieceFromPosition(pieceToTake)
            
-            self.pieces.append(move.specialMovePiece) 
-            if move.piece.side == WHITE:
-                self.points += move.specialMovePiece.value - 1 
-            if move.piece.side == BLACK:
-                self.points -= move.specialMovePiece.value - 1 
+            # The promoted piece only exists once the promotion is played.
+            promotedPiece = move.promotion(self, move.piece.side, move.newPos)
+            self.addPieceToPosition(promotedPiece, move.newPos)
+            self.pieces[promotedPiece] = None
             move.piece.movesMade += 1
 
         else:
@@ -432,23 +722,21 @@ class Board:
             pieceToTake = move.pieceToCapture
 
             if pieceToTake:
-                if pieceToTake.side == WHITE:
-                    self.points -= pieceToTake.value
-                if pieceToTake.side == BLACK:
-                    self.points += pieceToTake.value
-                self.pieces.remove(pieceToTake)
+                del self.pieces[pieceToTake]
+                self.removePieceFromPosition(pieceToTake)
 
             self.movePieceToPosition(pieceToMove, move.newPos)
             pieceToMove.movesMade += 1
         self.movesMade += 1
         self.currentSide = not self.currentSide
+        if castlingMayChange:
+            self.zobristKey ^= CASTLING_KEYS[self.castlingRights()]
+        self.zobristKey ^= self.passantKey() ^ BLACK_TO_MOVE_KEY
+        if self.verifyZobrist:
+            self.checkZobristKey()
 
     def getPointValueOfSide(self, side: bool) -> int:
-        points = 0
-        for piece in self.pieces:
-            if piece.side == side:
-                points += piece.value
-        return points
+        return self.evaluation.material[side]
 
     def getPointAdvantageOfSide(self, side: bool) -> int:
         return (
@@ -457,22 +745,30 @@ class Board:
         )
 
     def getAllMovesUnfiltered(
-            self, side: bool, includeKing: bool = True
+            self, side: bool, includeKing: bool = True,
+            kinds: int = ALL_MOVES
     ) -> list[Move]:
         unfilteredMoves = []
+        bitboards = self.bitboards
         for piece in self.pieces:
             if piece.side == side:
                 if includeKing or piece.stringRep != 'K':
-                    for move in piece.getPossibleMoves():
-                        unfilteredMoves.append(move)
+                    if bitboards is not None:
+                        unfilteredMoves.extend(
+                            bitboards.getPossibleMoves(self, piece, kinds)
+                        )
+                    else:
+                        unfilteredMoves.extend(piece.getPossibleMoves())
+        if bitboards is None and kinds != ALL_MOVES:
+            tactical = kinds == TACTICAL_MOVES
+            return [
+                move for move in unfilteredMoves
+                if move.isTactical == tactical
+            ]
         return unfilteredMoves
 
     def testIfLegalBoard(self, side: bool) -> bool:
-        for move in self.getAllMovesUnfiltered(side):
-            pieceToTake = move.pieceToCapture
-            if pieceToTake and pieceToTake.stringRep == 'K':
-                return False
-        return True
+        return not self.isInCheck(not side)
 
     def moveIsLegal(self, move: Move) -> bool:
         side = move.piece.side
@@ -482,10 +778,118 @@ class Board:
         return isLegal
 
    
+    def getCheckersAndPins(
+            self, side: bool
+    ) -> tuple[list[Piece], dict[int, tuple[int, int]]]:
+        king = self.kings[side]
+        kx, ky = king.position
+        squares = self.squares
+        pins = {}
+
+        for directions, sliderReps in (
+                (LINE_DIRECTIONS, 'RQ'),
+                (DIAGONAL_DIRECTIONS, 'BQ'),
+        ):
+            for dx, dy in directions:
+                x = kx + dx
+                y = ky + dy
+                ownPieceIndex = -1
+                while 0 <= x <= 7 and 0 <= y <= 7:
+                    index = y * 8 + x
+                    piece = squares[index]
+                    if piece is not None:
+                        if piece.side == side:
+                            if ownPieceIndex >= 0:
+                                break
+                            ownPieceIndex = index
+                        else:
+                            if (
+                                    ownPieceIndex >= 0
+                                    and piece.stringRep in sliderReps
+                            ):
+                                pins[ownPieceIndex] = (dx, dy)
+                            break
+                    x += dx
+                    y += dy
+
+        return self.attackersOf(king.position, not side), pins
+
     def getAllMovesLegal(self, side: bool) -> list[Move]:
-        unfilteredMoves = list(self.getAllMovesUnfiltered(side))
+        return [move.copy() for move in self.getLegalMoves(side)]
+
+    # The moves are shared with every other caller until the position
+    # changes, so they must not be modified; getAllMovesLegal and
+    # getMoveForCode hand out copies.
+    def getLegalMoves(self, side: bool) -> tuple[Move, ...]:
+        legalMoves = self.legalMovesCache.get(side)
+        if legalMoves is None:
+            legalMoves = tuple(self.generateLegalMoves(side))
+            self.legalMovesCache[side] = legalMoves
+        return legalMoves
+
+    # Mailbox pieces only generate all of their moves at once, so without the
+    # bitboards these generate every move and keep one kind. That suits the
+    # quiescence search, which wants the captures alone; MovePicker splits a
+    # single generation itself when it needs both kinds.
+    def getLegalCaptures(self, side: bool) -> list[Move]:
+        legalMoves = self.legalMovesCache.get(side)
+        if legalMoves is not None:
+            return [move for move in legalMoves if move.isTactical]
+        return self.generateLegalMoves(side, TACTICAL_MOVES)
+
+    def getLegalQuiets(self, side: bool) -> list[Move]:
+        legalMoves = self.legalMovesCache.get(side)
+        if legalMoves is not None:
+            return [move for move in legalMoves if not move.isTactical]
+        return self.generateLegalMoves(side, QUIET_MOVES)
+
+    def getMoveForCode(self, code: int) -> Optional[Move]:
+        for move in self.getLegalMoves(self.currentSide):
+            if move.code == code:
+                return move.copy()
+        return None
+
+    def generateLegalMoves(
+            self, side: bool, kinds: int = ALL_MOVES
+    ) -> list[Move]:
+        return self.filterLegalMoves(
+            side, self.getAllMovesUnfiltered(side, kinds=kinds)
+        )
+
+    # Checkers and pins can be passed in when several lists of moves from the
+    # same position are filtered one after another.
+    def filterLegalMoves(
+            self, side: bool, unfilteredMoves: list[Move],
+            checkersAndPins: Optional[
+                tuple[list[Piece], dict[int, tuple[int, int]]]
+            ] = None
+    ) -> list[Move]:
+        king = self.kings.get(side)
+        if king is None:
+            return [move for move in unfilteredMoves if self.moveIsLegal(move)]
+
+        if checkersAndPins is None:
+            checkersAndPins = self.getCheckersAndPins(side)
+        checkers, pins = checkersAndPins
+        kx, ky = king.position
         legalMoves = []
         for move in unfilteredMoves:
-            if self.moveIsLegal(move):
-                legalMoves.append(move)
+            piece = move.piece
+            if checkers or piece is king or move.passant:
+                if self.moveIsLegal(move):
+                    legalMoves.append(move)
+                continue
+            x, y = move.oldPos
+            pin = pins.get(y * 8 + x)
+            if pin is not None:
+                # A pinned piece may only move along the line between its
+                # king and the pinning piece.
+                dx = move.newPos[0] - kx
+                dy = move.newPos[1] - ky
+                if (
+                        dx * pin[1] != dy * pin[0]
+                        or dx * pin[0] + dy * pin[1] <= 0
+                ):
+                    continue
+            legalMoves.append(move)
         return legalMoves
@@ -1,109 +1,518 @@
 from __future__ import annotations
 
+import multiprocessing
 import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.sharedctypes import Synchronized
+from typing import Optional
 
 from Board import Board
+from Evaluation import Evaluator, evaluateTapered
 from InputParser import InputParser
 from Move import Move
-from MoveNode import MoveNode
+from MovePicker import MoveHistory, MovePicker, captureOrder
+from OpeningBook import OpeningBook
+from Tablebase import ProbeResult, Tablebases
+from TranspositionTable import (
+    EXACT,
+    LOWER_BOUND,
+    UPPER_BOUND,
+    TranspositionTable,
+)
 
 WHITE = True
 BLACK = False
+CHECKMATE_SCORE = 100000
+INFINITY = 1000000
+MATE_THRESHOLD = CHECKMATE_SCORE - 1000
+MAX_SEARCH_DEPTH = 64
+DELTA_MARGIN = 200
+
+
+class SearchTimeout(Exception):
+    pass
 
 
 class Bot:
     depth = 1
     movesAnalyzed = 0
+    endgameDepth = 8
+    endgameTimeLimit = 5.0
 
-    def __init__(self, board: Board, side: bool, depth: int):
+    def __init__(
+            self, board: Board, side: bool, depth: int,
+            hashSizeMB: float = 16, timeLimit: Optional[float] = None,
+            nodeLimit: Optional[int] = None, workers: int = 1,
+            evaluate: Evaluator = evaluateTapered, quiescence: bool = True,
+            book: Optional[OpeningBook] = None,
+            tablebases: Optional[Tablebases] = None
+    ):
         self.board = board
         self.side = side
         self.depth = depth
+        self.hashSizeMB = hashSizeMB
+        self.timeLimit = timeLimit
+        self.nodeLimit = nodeLimit
+        self.workers = workers
+        self.evaluate = evaluate
+        self.useQuiescence = quiescence
+        self.book = book
+        self.tablebases = tablebases
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.deadline: Optional[float] = None
+        self.nodeBudgetEnd: Optional[int] = None
+        # Workers of a parallel search add their nodes to one count shared
+        # with the pool, so the node budget holds for all of them together.
+        self.poolNodes: Optional[Synchronized] = None
+        self.sharedNodes: Optional[Synchronized] = None
+        self.nodesShared = 0
+        self.completedDepth = 0
+        self.transpositionTable: Optional[TranspositionTable] = (
+            TranspositionTable(hashSizeMB) if hashSizeMB > 0 else None
+        )
         self.parser = InputParser(self.board, self.side)
+        self.principalVariation: list[Move] = []
+        self.bestScore = 0
+        self.moveHistory = MoveHistory()
 
     def getRandomMove(self) -> Move:
         legalMoves = list(self.board.getAllMovesLegal(self.side))
         randomMove = random.choice(legalMoves)
         return randomMove
 
-    def generateMoveTree(self) -> list[MoveNode]:
-        moveTree = []
-        for move in self.board.getAllMovesLegal(self.side):
-            moveTree.append(MoveNode(move, [], None))
-
-        for node in moveTree:
-            self.board.makeMove(node.move)
-            self.populateNodeChildren(node)
-            self.board.undoLastMove()
-        return moveTree
-
-    def populateNodeChildren(self, node: MoveNode) -> None:
-        node.pointAdvantage = self.board.getPointAdvantageOfSide(self.side)
-        node.depth = node.getDepth()
-        if node.depth == self.depth:
-            return
+    def negamax(
+            self, depth: int, alpha: int, beta: int, ply: int,
+            principalVariation: list[Move]
+    ) -> int:
+        # A position that already occurred is scored as a draw at once; the
+        # side that is better off can always choose not to repeat it.
+        board = self.board
+        if board.isRepetition() or (
+                board.isFiftyMoveDraw() and not board.isCheckmate()
+        ):
+            return max(alpha, min(beta, 0))
+
+        if self.tablebases is not None:
+            result = self.tablebases.probe(self.board)
+            if result is not None:
+                return max(alpha, min(beta, tablebaseScore(result, ply)))
+
+        if depth == 0:
+            if self.useQuiescence:
+                return self.quiescence(alpha, beta)
+            return self.evaluate(self.board, self.board.currentSide)
+
+        table = self.transpositionTable
+        key = self.board.zobristKey
+        tableMoveCode = None
+        if table is not None:
+            entry = table.probe(key)
+            if entry is not None:
+                tableMoveCode = entry.moveCode
+                if entry.depth >= depth:
+                    score = scoreFromTable(entry.score, ply)
+                    if entry.bound == EXACT:
+                        return max(alpha, min(beta, score))
+                    if entry.bound == LOWER_BOUND and score >= beta:
+                        return beta
+                    if entry.bound == UPPER_BOUND and score <= alpha:
+                        return alpha
 
+        originalAlpha = alpha
+        bestMove = None
+        movesSearched = 0
+        for move in MovePicker(
+                self.board, self.moveHistory, ply, tableMoveCode
+        ):
+            movesSearched += 1
+            self.movesAnalyzed += 1
+            if self.movesAnalyzed & 255 == 0:
+                self.checkBudget()
+            childVariation: list[Move] = []
+            self.board.makeMove(move)
+            try:
+                score = -self.negamax(
+                    depth - 1, -beta, -alpha, ply + 1, childVariation
+                )
+            finally:
+                self.board.undoLastMove()
+            if score >= beta:
+                self.moveHistory.recordCutoff(move, depth, ply)
+                if table is not None:
+                    table.store(
+                        key, depth, scoreToTable(beta, ply), LOWER_BOUND,
+                        move.code
+                    )
+                return beta
+            if score > alpha:
+                alpha = score
+                bestMove = move
+                principalVariation[:] = [move] + childVariation
+
+        if movesSearched == 0:
+            if self.board.isInCheck(self.board.currentSide):
+                return -CHECKMATE_SCORE + ply
+            return 0
+
+        if table is not None:
+            bound = EXACT if alpha > originalAlpha else UPPER_BOUND
+            table.store(
+                key, depth, scoreToTable(alpha, ply), bound,
+                bestMove.code if bestMove is not None else tableMoveCode
+            )
+        return alpha
+
+    def quiescence(self, alpha: int, beta: int) -> int:
         side = self.board.currentSide
+        standPat = self.evaluate(self.board, side)
+        if standPat >= beta:
+            return beta
+        if standPat > alpha:
+            alpha = standPat
+        moves = self.board.getLegalCaptures(side)
+        moves.sort(key=captureOrder, reverse=True)
 
-        legalMoves = self.board.getAllMovesLegal(side)
-        if not legalMoves:
-            if self.board.isCheckmate():
-                node.move.checkmate = True
-                return
-            elif self.board.isStalemate():
-                node.move.stalemate = True
-                node.pointAdvantage = 0
-                return
-            raise Exception()
-
-        for move in legalMoves:
+        for move in moves:
+            if self.isFutileCapture(move, standPat, alpha):
+                continue
             self.movesAnalyzed += 1
-            node.children.append(MoveNode(move, [], node))
+            if self.movesAnalyzed & 255 == 0:
+                self.checkBudget()
+            self.board.makeMove(move)
+            try:
+                score = -self.quiescence(-beta, -alpha)
+            finally:
+                self.board.undoLastMove()
+            if score >= beta:
+                return beta
+            if score > alpha:
+                alpha = score
+        return alpha
+
+    def isFutileCapture(self, move: Move, standPat: int, alpha: int) -> bool:
+        gain = 0
+        if move.pieceToCapture is not None:
+            gain += move.pieceToCapture.value
+        if move.promotion:
+            gain += move.promotion.value - 1
+        if standPat + 100 * gain + DELTA_MARGIN <= alpha:
+            return True
+        # Giving up a bigger piece for a defended one is left to the full
+        # search; most such captures only lose material.
+        return move.piece.value > gain and self.board.isSquareAttacked(
+            move.newPos, not move.piece.side
+        )
+
+    def checkBudget(self) -> None:
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise SearchTimeout()
+        if self.nodeBudgetEnd is None:
+            return
+        nodes = self.movesAnalyzed
+        if self.sharedNodes is not None:
+            with self.sharedNodes.get_lock():
+                self.sharedNodes.value += nodes - self.nodesShared
+                self.nodesShared = nodes
+                nodes = self.sharedNodes.value
+        if nodes >= self.nodeBudgetEnd:
+            raise SearchTimeout()
+
+    def searchRoot(
+            self, depth: int, rootMoves: list[Move],
+            bestScore: int = -INFINITY
+    ) -> list[Move]:
+        bestMoves: list[Move] = []
+        principalVariation: list[Move] = []
+        for move in rootMoves:
+            childVariation: list[Move] = []
             self.board.makeMove(move)
-            self.populateNodeChildren(node.children[-1])
-            self.board.undoLastMove()
-
-    def getOptimalPointAdvantageForNode(self, node: MoveNode) -> int:
-        if node.children:
-            for child in node.children:
-                child.pointAdvantage = self.getOptimalPointAdvantageForNode(
-                    child
+            try:
+                # Searching with alpha one below the best score keeps moves
+                # that tie with it exact, so every equally good move is found.
+                score = -self.negamax(
+                    depth - 1, -INFINITY, -(bestScore - 1), 1,
+                    childVariation
                 )
+            finally:
+                self.board.undoLastMove()
+            if score > bestScore:
+                bestScore = score
+                bestMoves = [move]
+                principalVariation = [move] + childVariation
+            elif score == bestScore:
+                bestMoves.append(move)
+        self.bestScore = bestScore
+        self.principalVariation = principalVariation
+        return bestMoves
 
-            if node.children[0].depth % 2 == 1:
-                return max(node.children).pointAdvantage
-            else:
-                return min(node.children).pointAdvantage
+    def searchRootParallel(
+            self, depth: int, rootMoves: list[Move]
+    ) -> list[Move]:
+        if self.executor is None:
+            self.poolNodes = multiprocessing.Value('q', 0)
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=setWorkerSharedNodes,
+                initargs=(self.poolNodes,),
+            )
+
+        # The leading move is searched here first, so every worker starts
+        # with its score as a lower bound instead of an open window. Its
+        # score and variation only replace the previous iteration's once the
+        # workers have finished, since a timeout keeps the previous moves.
+        previousScore = self.bestScore
+        previousVariation = self.principalVariation
+        firstMoves = self.searchRoot(depth, rootMoves[:1])
+        firstScore = self.bestScore
+        firstVariation = self.principalVariation
+        if len(rootMoves) == 1:
+            return firstMoves
+        self.bestScore = previousScore
+        self.principalVariation = previousVariation
+
+        moveForNotation = {
+            self.board.getCoordinateNotationOfMove(move): move
+            for move in rootMoves
+        }
+        notations = list(moveForNotation)[1:]
+        # Dealing moves out round-robin spreads the previous iteration's
+        # best moves, which sit at the front, across all workers.
+        chunks = [
+            notations[index::self.workers] for index in range(self.workers)
+        ]
+        chunks = [chunk for chunk in chunks if chunk]
+        # Clocks of different processes need not agree, so the workers get
+        # the wall-clock time the search must end by. They share what is left
+        # of the node budget after the leading move, counting their nodes
+        # together; which of them stops first then depends on timing.
+        deadline = None
+        if self.deadline is not None:
+            deadline = time.time() + self.deadline - time.perf_counter()
+        nodeLimit = None
+        if self.nodeBudgetEnd is not None:
+            nodeLimit = max(1, self.nodeBudgetEnd - self.movesAnalyzed)
+        if self.poolNodes is not None:
+            self.poolNodes.value = 0
+        # Workers replay the moves since the last capture or pawn move, so
+        # they see the same repetitions as this search does.
+        fen, moveCodes = self.board.getReversibleHistory()
+        useBitboards = self.board.bitboards is not None
+        tablebaseDirectory = None
+        if self.tablebases is not None:
+            tablebaseDirectory = self.tablebases.directory
+        futures = [
+            self.executor.submit(
+                searchRootMovesInWorker, fen, moveCodes, useBitboards, chunk,
+                depth,
+                firstScore, self.hashSizeMB, deadline, nodeLimit,
+                self.evaluate, self.useQuiescence, tablebaseDirectory,
+            )
+            for chunk in chunks
+        ]
+        results = [future.result() for future in futures]
+        self.movesAnalyzed += sum(result[3] for result in results)
+        if not all(result[0] for result in results):
+            raise SearchTimeout()
+
+        bestScore = max([firstScore] + [result[1] for result in results])
+        bestNotations = {
+            notation
+            for completed, score, chunkBest, nodes in results
+            if score == bestScore
+            for notation in chunkBest
+        }
+        bestMoves = firstMoves if firstScore == bestScore else []
+        bestMoves = bestMoves + [
+            move for notation, move in moveForNotation.items()
+            if notation in bestNotations
+        ]
+        self.bestScore = bestScore
+        if firstScore == bestScore:
+            self.principalVariation = firstVariation
         else:
-            return node.pointAdvantage
-
-    def getBestMove(self) -> Move:
-        if self.board.getPointValueOfSide(WHITE) <= 105:
-            self.depth = 8
-        moveTree = self.generateMoveTree()
-        bestMoves = self.bestMovesWithMoveTree(moveTree)
-        randomBestMove = random.choice(bestMoves)
+            self.principalVariation = bestMoves[:1]
+        return bestMoves
+
+    def close(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def getBestMoves(
+            self, timeLimit: Optional[float] = None,
+            nodeLimit: Optional[int] = None, maxDepth: Optional[int] = None
+    ) -> list[Move]:
+        # A position in the tablebases is played perfectly without a search.
+        if self.tablebases is not None:
+            found = self.tablebases.getBestMoves(self.board)
+            if found is not None:
+                bestMoves, result = found
+                self.completedDepth = 0
+                self.bestScore = tablebaseScore(result, 0)
+                self.principalVariation = bestMoves[:1]
+                return bestMoves
+
+        timeLimit = timeLimit if timeLimit is not None else self.timeLimit
+        nodeLimit = nodeLimit if nodeLimit is not None else self.nodeLimit
+        if maxDepth is None:
+            if timeLimit is not None or nodeLimit is not None:
+                maxDepth = MAX_SEARCH_DEPTH
+            elif self.board.getPointValueOfSide(WHITE) <= 105:
+                maxDepth = self.endgameDepth
+                timeLimit = self.endgameTimeLimit
+            else:
+                maxDepth = self.depth
+
+        rootMoves = self.board.getAllMovesLegal(self.side)
+        bestMoves = rootMoves
+        self.completedDepth = 0
+        self.moveHistory.clear()
+        start = time.perf_counter()
+        nodesAtStart = self.movesAnalyzed
+        for depth in range(1, maxDepth + 1):
+            # The first iteration always completes so there is a move to play.
+            if depth > 1:
+                if timeLimit is not None:
+                    self.deadline = start + timeLimit
+                if nodeLimit is not None:
+                    self.nodeBudgetEnd = nodesAtStart + nodeLimit
+            try:
+                if self.workers > 1:
+                    bestMoves = self.searchRootParallel(depth, rootMoves)
+                else:
+                    bestMoves = self.searchRoot(depth, rootMoves)
+            except SearchTimeout:
+                break
+            finally:
+                self.deadline = None
+                self.nodeBudgetEnd = None
+            self.completedDepth = depth
+            if abs(self.bestScore) > MATE_THRESHOLD:
+                break
+            rootMoves = bestMoves + [
+                move for move in rootMoves if move not in bestMoves
+            ]
+        return bestMoves
+
+    def getBestMove(
+            self, timeLimit: Optional[float] = None,
+            nodeLimit: Optional[int] = None
+    ) -> Move:
+        if self.book is not None:
+            bookMove = self.book.chooseMove(self.board)
+            if bookMove is not None:
+                bookMove.notation = self.parser.notationForMove(bookMove)
+                return bookMove
+        bestMoves = self.getBestMoves(timeLimit, nodeLimit)
+        randomBestMove = random.choice(bestMoves).copy()
         randomBestMove.notation = self.parser.notationForMove(randomBestMove)
         return randomBestMove
 
     def makeBestMove(self) -> None:
         self.board.makeMove(self.getBestMove())
 
-    def bestMovesWithMoveTree(self, moveTree: list[MoveNode]) -> list[Move]:
-        bestMoveNodes: list[MoveNode] = []
-        for moveNode in moveTree:
-            moveNode.pointAdvantage = self.getOptimalPointAdvantageForNode(
-                moveNode
-            )
-            if not bestMoveNodes:
-                bestMoveNodes.append(moveNode)
-            elif moveNode > bestMoveNodes[0]:
-                bestMoveNodes = []
-                bestMoveNodes.append(moveNode)
-            elif moveNode == bestMoveNodes[0]:
-                bestMoveNodes.append(moveNode)
 
-        return [node.move for node in bestMoveNodes]
+workerTranspositionTable: Optional[TranspositionTable] = None
+workerTablebases: dict[str, Tablebases] = {}
+workerSharedNodes: Optional[Synchronized] = None
+
+
+def setWorkerSharedNodes(sharedNodes: Synchronized) -> None:
+    global workerSharedNodes
+    workerSharedNodes = sharedNodes
+
+
+# Tablebases are loaded once per process and kept for every later search the
+# process runs.
+def getWorkerTablebases(directory: Optional[str]) -> Optional[Tablebases]:
+    if directory is None:
+        return None
+    tablebases = workerTablebases.get(directory)
+    if tablebases is None:
+        tablebases = Tablebases(directory)
+        workerTablebases[directory] = tablebases
+    return tablebases
+
+
+# Keys are the same in every process, so a worker's table stays useful
+# across iterations and across positions of the same game.
+def getWorkerTranspositionTable(
+        sizeMB: float
+) -> Optional[TranspositionTable]:
+    global workerTranspositionTable
+    if sizeMB <= 0:
+        return None
+    if (
+            workerTranspositionTable is None
+            or workerTranspositionTable.sizeMB != sizeMB
+    ):
+        workerTranspositionTable = TranspositionTable(sizeMB)
+    return workerTranspositionTable
+
+
+def searchRootMovesInWorker(
+        fen: str, moveCodes: list[int], useBitboards: bool,
+        notations: list[str], depth: int,
+        scoreToMatch: int, hashSizeMB: float, deadline: Optional[float],
+        nodeLimit: Optional[int], evaluate: Evaluator, quiescence: bool,
+        tablebaseDirectory: Optional[str] = None
+) -> tuple[bool, int, list[str], int]:
+    board = Board.fromReversibleHistory(fen, moveCodes, useBitboards)
+    bot = Bot(
+        board, board.currentSide, depth, hashSizeMB=0, evaluate=evaluate,
+        quiescence=quiescence,
+        tablebases=getWorkerTablebases(tablebaseDirectory),
+    )
+    transpositionTable = getWorkerTranspositionTable(hashSizeMB)
+    if transpositionTable is not None:
+        bot.transpositionTable = transpositionTable
+
+    moveForNotation = {
+        board.getCoordinateNotationOfMove(move): move
+        for move in board.getAllMovesLegal(board.currentSide)
+    }
+    rootMoves = [moveForNotation[notation] for notation in notations]
+    if deadline is not None:
+        bot.deadline = time.perf_counter() + deadline - time.time()
+    if nodeLimit is not None:
+        bot.nodeBudgetEnd = nodeLimit
+        bot.sharedNodes = workerSharedNodes
+    try:
+        bestMoves = bot.searchRoot(depth, rootMoves, scoreToMatch)
+    except SearchTimeout:
+        return False, 0, [], bot.movesAnalyzed
+    return (
+        True,
+        bot.bestScore,
+        [board.getCoordinateNotationOfMove(move) for move in bestMoves],
+        bot.movesAnalyzed,
+    )
+
+
+# Mate scores are stored relative to the node rather than the root, so an
+# entry reached at a different ply still reports the right distance to mate.
+def scoreToTable(score: int, ply: int) -> int:
+    if score > MATE_THRESHOLD:
+        return score + ply
+    if score < -MATE_THRESHOLD:
+        return score - ply
+    return score
+
+
+def scoreFromTable(score: int, ply: int) -> int:
+    if score > MATE_THRESHOLD:
+        return score - ply
+    if score < -MATE_THRESHOLD:
+        return score + ply
+    return score
+
+
+def tablebaseScore(result: ProbeResult, ply: int) -> int:
+    if result.wdl > 0:
+        return CHECKMATE_SCORE - ply - result.plies
+    if result.wdl < 0:
+        return -CHECKMATE_SCORE + ply + result.plies
+    return 0
 
 
 if __name__ == '__main__':
@@ -113,4 +522,6 @@ if __name__ == '__main__':
     bot.makeBestMove()
     print(mainBoard)
     print(bot.movesAnalyzed)
+    if bot.transpositionTable is not None:
+        print(bot.transpositionTable.stats())
     print(mainBoard.movesMade)
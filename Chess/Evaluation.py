@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Callable
+
+if TYPE_CHECKING:
+    from Board import Board
+    from Piece import Piece
+
+WHITE = True
+BLACK = False
+
+MIDGAME_VALUES = {'▲': 100, 'N': 320, 'B': 330, 'R': 500, 'Q': 900, 'K': 0}
+ENDGAME_VALUES = {'▲': 120, 'N': 300, 'B': 320, 'R': 520, 'Q': 920, 'K': 0}
+PHASE_WEIGHTS = {'▲': 0, 'N': 1, 'B': 1, 'R': 2, 'Q': 4, 'K': 0}
+MAX_PHASE = 24
+
+# Tables are written from white's side with rank 8 on top, the way a board is
+# printed.
+PAWN_TABLE = [
+    0, 0, 0, 0, 0, 0, 0, 0,
+    50, 50, 50, 50, 50, 50, 50, 50,
+    10, 10, 20, 30, 30, 20, 10, 10,
+    5, 5, 10, 25, 25, 10, 5, 5,
+    0, 0, 0, 20, 20, 0, 0, 0,
+    5, -5, -10, 0, 0, -10, -5, 5,
+    5, 10, 10, -20, -20, 10, 10, 5,
+    0, 0, 0, 0, 0, 0, 0, 0,
+]
+PAWN_ENDGAME_TABLE = [
+    0, 0, 0, 0, 0, 0, 0, 0,
+    80, 80, 80, 80, 80, 80, 80, 80,
+    50, 50, 50, 50, 50, 50, 50, 50,
+    30, 30, 30, 30, 30, 30, 30, 30,
+    20, 20, 20, 20, 20, 20, 20, 20,
+    10, 10, 10, 10, 10, 10, 10, 10,
+    10, 10, 10, 10, 10, 10, 10, 10,
+    0, 0, 0, 0, 0, 0, 0, 0,
+]
+KNIGHT_TABLE = [
+    -50, -40, -30, -30, -30, -30, -40, -50,
+    -40, -20, 0, 0, 0, 0, -20, -40,
+    -30, 0, 10, 15, 15, 10, 0, -30,
+    -30, 5, 15, 20, 20, 15, 5, -30,
+    -30, 0, 15, 20, 20, 15, 0, -30,
+    -30, 5, 10, 15, 15, 10, 5, -30,
+    -40, -20, 0, 5, 5, 0, -20, -40,
+    -50, -40, -30, -30, -30, -30, -40, -50,
+]
+BISHOP_TABLE = [
+    -20, -10, -10, -10, -10, -10, -10, -20,
+    -10, 0, 0, 0, 0, 0, 0, -10,
+    -10, 0, 5, 10, 10, 5, 0, -10,
+    -10, 5, 5, 10, 10, 5, 5, -10,
+    -10, 0, 10, 10, 10, 10, 0, -10,
+    -10, 10, 10, 10, 10, 10, 10, -10,
+    -10, 5, 0, 0, 0, 0, 5, -10,
+    -20, -10, -10, -10, -10, -10, -10, -20,
+]
+ROOK_TABLE = [
+    0, 0, 0, 0, 0, 0, 0, 0,
+    5, 10, 10, 10, 10, 10, 10, 5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    0, 0, 0, 5, 5, 0, 0, 0,
+]
+QUEEN_TABLE = [
+    -20, -10, -10, -5, -5, -10, -10, -20,
+    -10, 0, 0, 0, 0, 0, 0, -10,
+    -10, 0, 5, 5, 5, 5, 0, -10,
+    -5, 0, 5, 5, 5, 5, 0, -5,
+    0, 0, 5, 5, 5, 5, 0, -5,
+    -10, 5, 5, 5, 5, 5, 0, -10,
+    -10, 0, 5, 0, 0, 0, 0, -10,
+    -20, -10, -10, -5, -5, -10, -10, -20,
+]
+KING_TABLE = [
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -20, -30, -30, -40, -40, -30, -30, -20,
+    -10, -20, -20, -20, -20, -20, -20, -10,
+    20, 20, 0, 0, 0, 0, 20, 20,
+    20, 30, 10, 0, 0, 10, 30, 20,
+]
+KING_ENDGAME_TABLE = [
+    -50, -40, -30, -20, -20, -30, -40, -50,
+    -30, -20, -10, 0, 0, -10, -20, -30,
+    -30, -10, 20, 30, 30, 20, -10, -30,
+    -30, -10, 30, 40, 40, 30, -10, -30,
+    -30, -10, 30, 40, 40, 30, -10, -30,
+    -30, -10, 20, 30, 30, 20, -10, -30,
+    -30, -30, 0, 0, 0, 0, -30, -30,
+    -50, -30, -30, -30, -30, -30, -30, -50,
+]
+
+MIDGAME_TABLES = {
+    '▲': PAWN_TABLE, 'N': KNIGHT_TABLE, 'B': BISHOP_TABLE, 'R': ROOK_TABLE,
+    'Q': QUEEN_TABLE, 'K': KING_TABLE,
+}
+ENDGAME_TABLES = {
+    '▲': PAWN_ENDGAME_TABLE, 'N': KNIGHT_TABLE, 'B': BISHOP_TABLE,
+    'R': ROOK_TABLE, 'Q': QUEEN_TABLE, 'K': KING_ENDGAME_TABLE,
+}
+
+
+def squareScores(
+        values: dict[str, int], tables: dict[str, list[int]]
+) -> dict[bool, dict[str, list[int]]]:
+    scores: dict[bool, dict[str, list[int]]] = {WHITE: {}, BLACK: {}}
+    for stringRep, table in tables.items():
+        value = values[stringRep]
+        # Square indexes run from a1 upwards, so white reads the printed table
+        # bottom to top and black reads it mirrored.
+        scores[WHITE][stringRep] = [
+            value + table[(7 - square // 8) * 8 + square % 8]
+            for square in range(64)
+        ]
+        scores[BLACK][stringRep] = [
+            value + table[square] for square in range(64)
+        ]
+    return scores
+
+
+MIDGAME_SCORES = squareScores(MIDGAME_VALUES, MIDGAME_TABLES)
+ENDGAME_SCORES = squareScores(ENDGAME_VALUES, ENDGAME_TABLES)
+
+
+class Evaluation:
+    def __init__(self) -> None:
+        self.material = {WHITE: 0, BLACK: 0}
+        self.midgame = {WHITE: 0, BLACK: 0}
+        self.endgame = {WHITE: 0, BLACK: 0}
+        self.phase = 0
+
+    def addPiece(self, piece: Piece, square: int) -> None:
+        side = piece.side
+        stringRep = piece.stringRep
+        self.material[side] += piece.value
+        self.midgame[side] += MIDGAME_SCORES[side][stringRep][square]
+        self.endgame[side] += ENDGAME_SCORES[side][stringRep][square]
+        self.phase += PHASE_WEIGHTS[stringRep]
+
+    def removePiece(self, piece: Piece, square: int) -> None:
+        side = piece.side
+        stringRep = piece.stringRep
+        self.material[side] -= piece.value
+        self.midgame[side] -= MIDGAME_SCORES[side][stringRep][square]
+        self.endgame[side] -= ENDGAME_SCORES[side][stringRep][square]
+        self.phase -= PHASE_WEIGHTS[stringRep]
+
+    def evaluate(self, side: bool) -> int:
+        phase = min(self.phase, MAX_PHASE)
+        midgame = self.midgame[side] - self.midgame[not side]
+        endgame = self.endgame[side] - self.endgame[not side]
+        return (midgame * phase + endgame * (MAX_PHASE - phase)) // MAX_PHASE
+
+
+Evaluator = Callable[['Board', bool], int]
+
+
+def evaluateTapered(board: Board, side: bool) -> int:
+    return board.evaluation.evaluate(side)
+
+
+def evaluateMaterial(board: Board, side: bool) -> int:
+    return 100 * board.getPointAdvantageOfSide(side)
+
+
+def evaluateFromScratch(board: Board, side: bool) -> int:
+    evaluation = Evaluation()
+    for piece in board.pieces:
+        x, y = piece.position
+        evaluation.addPiece(piece, y * 8 + x)
+    return evaluation.evaluate(side)
+
+
+EVALUATORS: dict[str, Evaluator] = {
+    'tapered': evaluateTapered,
+    'scratch': evaluateFromScratch,
+    'material': evaluateMaterial,
+}
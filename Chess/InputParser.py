@@ -1,132 +1,299 @@
 from __future__ import annotations
 
 import re
+from typing import TYPE_CHECKING, Iterable, Optional
 
-from Board import Board
+from Board import FILE_LETTERS, Board
+from King import King
 from Move import Move
 from Pawn import Pawn
 
+if TYPE_CHECKING:
+    from Coordinate import Coordinate as C
+    from Piece import Piece
+
+NOTATION_PATTERN = re.compile(
+    '(?i)(?:[KQRBNP]?[a-h]?[1-8]?[a-h][1-8]?|[a-h][1-8][a-h][1-8])[QRBN]?$'
+)
+ALGEBRAIC_PATTERN = re.compile(
+    '([KQRBN])?([a-h])?([1-8])?x?([a-h][1-8])(?:=?([QRBN]))?$'
+)
+CASTLING_NOTATIONS = {'00': '0-0', '000': '0-0-0'}
+SUFFIX_MARKS = '+#!?'
+
+
+# Captures, promotion signs, dashes and check or annotation marks are all
+# optional when typing a move, so they are dropped before the lookup.
+def normalizeNotation(notation: str) -> str:
+    notation = notation.strip().rstrip(SUFFIX_MARKS)
+    for mark in 'x-=':
+        notation = notation.replace(mark, '')
+    if notation.upper() in ('OO', 'OOO'):
+        notation = notation.upper().replace('O', '0')
+    return notation
+
 
 class InputParser:
     def __init__(self, board: Board, side: bool):
         self.board = board
         self.side = side
+        self.indexedMoves: Optional[tuple[Move, ...]] = None
+        self.notationIndex: dict[str, Move] = {}
+        self.lowercaseIndex: dict[str, Move] = {}
 
     def parse(self, humanInput: str) -> Move:
-        regexCoordinateNotation = re.compile('(?i)[a-h][1-8][a-h][1-8][QRBN]?')
-        if regexCoordinateNotation.match(humanInput):
-            return self.moveForCoordinateNotation(humanInput)
-        regexAlgebraicNotation = re.compile(
-            '(?i)0-0|0-0-0|(?:[KQRBNP]?[a-h]?[1-8]?x?[a-h][1-8]|[Pa-h]x?[a-h])(?:=?[QRBN])?' 
-        )
-        if regexAlgebraicNotation.match(humanInput):
-            return self.moveForShortAlgebraicNotation(humanInput)
-        if re.compile('(?i)O-O|O-O-O').match(humanInput):
-            return self.moveForShortAlgebraicNotation(
-                humanInput.upper().replace('O', '0')
-            )
+        notation = normalizeNotation(humanInput)
+        self.indexMoves(self.side)
+        move = self.notationIndex.get(notation)
+        if move is None:
+            move = self.lowercaseIndex.get(notation.lower())
+        if move is not None:
+            return move
+        if (
+                notation in CASTLING_NOTATIONS
+                or NOTATION_PATTERN.match(notation)
+        ):
+            raise ValueError('Illegal move: %s' % humanInput)
         raise ValueError('Invalid move: %s' % humanInput)
 
     def moveForCoordinateNotation(self, notation: str) -> Move:
-        for move in self.board.getAllMovesLegal(self.side):
-            if self.board.getCoordinateNotationOfMove(
-                    move).lower() == notation.lower():
-                move.notation = self.notationForMove(move)
-                return move
-        raise ValueError('Illegal move: %s' % notation)
-   
+        return self.parse(notation)
+
+    # Well-formed short algebraic notation, as found in PGN files, is matched
+    # straight against the legal moves without building the notation index.
+    # Anything else, or a match that is not unique, goes through parse().
     def moveForShortAlgebraicNotation(self, notation: str) -> Move:
-        shortNotation = notation.replace('x', '')
-        moves = self.getLegalMovesWithNotation(self.side, False)
-        for move in moves:
-            if move.notation.replace('x', '') == shortNotation:
-                return move 
-        for move in moves:
-            if move.notation.replace('x', '').lower() == shortNotation.lower():
-                return move
-        moves = self.getLegalMovesWithNotation(self.side, True)
-        for move in moves:
-            if move.notation.replace('x', '') == shortNotation:
-                return move 
-        for move in moves:
-            if move.notation.replace('x', '').lower() == shortNotation.lower():
-                return move
-        shortNotation = notation.lower().replace('p', '').replace('=', '')
-        if re.compile('[a-h][1-8]?[qrbn]?').match(shortNotation):
-            for move in moves:
-                if type(move.piece) is Pawn and not move.pieceToCapture \
-                        and self.board.getCoordinateNotationOfMove(
-                        move).replace('=', '').lower().endswith(shortNotation):
-                    return move
-            for move in moves:
-                if type(move.piece) is Pawn and not move.pieceToCapture \
-                        and re.sub(
-                        '[1-8]', '', self.board.getCoordinateNotationOfMove(
-                                move), ).replace('=', '').lower().endswith(
-                        shortNotation):
-                    return move 
-        shortNotation = shortNotation.lower().replace('x', '')
-        if re.compile('[a-h]?[a-h][1-8]?[qrbn]?').match(shortNotation):
-            for move in moves:
-                if type(move.piece) is Pawn and move.pieceToCapture \
-                        and self.board.getCaptureNotation(
-                        move).replace('x', '').lower().endswith(shortNotation):
-                   
-                    return move
-            for move in moves:
-                if type(move.piece) is Pawn and move.pieceToCapture and re.sub(
-                        '[1-8]', '',
-                        self.board.getCaptureNotation(move).replace('x',
-                                                                    ''),
-                ).lower().endswith(shortNotation):
-                   
-                    return move
-        raise ValueError('Illegal move: %s' % notation)
+        match = ALGEBRAIC_PATTERN.match(notation.strip().rstrip(SUFFIX_MARKS))
+        if match is None:
+            return self.parse(notation)
+        letter, oldFile, oldRank, square, promotion = match.groups()
+        newPos = (FILE_LETTERS.index(square[0]), int(square[1]) - 1)
+        oldX = FILE_LETTERS.index(oldFile) if oldFile else None
+        oldY = int(oldRank) - 1 if oldRank else None
+        found = None
+        for move in self.board.getLegalMoves(self.side):
+            if move.newPos != newPos:
+                continue
+            piece = move.piece
+            if letter:
+                if piece.stringRep != letter:
+                    continue
+            elif type(piece) is not Pawn:
+                continue
+            x, y = move.oldPos
+            if (oldX is not None and x != oldX) or (
+                    oldY is not None and y != oldY
+            ):
+                continue
+            if (move.promotion and move.promotion.stringRep) != promotion:
+                continue
+            if found is not None:
+                return self.parse(notation)
+            found = move
+        if found is None:
+            return self.parse(notation)
+        return found.copy()
 
     def notationForMove(self, move: Move) -> str:
-        side = self.board.getSideOfMove(move)
-        moves = self.getLegalMovesWithNotation(side)
-        for m in moves:
-            if m == move:
-                return m.notation
-        return '' 
-
-    def getLegalMovesWithNotation(
-            self, side: bool, short: bool = True) -> list[Move]:
-        moves = []
-        for legalMove in self.board.getAllMovesLegal(side):
-            moves.append(legalMove)
-            legalMove.notation = self.board.getAlgebraicNotationOfMove(
-                legalMove, short
-            )
+        return self.notationsForMoves([move])[0]
 
-        duplicateNotationMoves = self.duplicateMovesFromMoves(moves)
-        for duplicateMove in duplicateNotationMoves:
-            duplicateMove.notation = self.board.getAlgebraicNotationOfMoveWithFile( 
-                duplicateMove, short
+    # Writes short algebraic notation for legal moves of the side to move
+    # without generating the other legal moves. Pins and the pieces that
+    # can reach each target square are worked out once for the whole list.
+    def notationsForMoves(self, moves: Iterable[Move]) -> list[str]:
+        moves = list(moves)
+        if not moves:
+            return []
+        board = self.board
+        side = board.getSideOfMove(moves[0])
+        pins = board.getCheckersAndPins(side)[1] if side in board.kings else {}
+        rivalsForTarget: dict[tuple[str, C], list[Piece]] = {}
+        notations = []
+        for move in moves:
+            disambiguation = ''
+            piece = move.piece
+            if type(piece) is not Pawn and type(piece) is not King:
+                target = (piece.stringRep, move.newPos)
+                rivals = rivalsForTarget.get(target)
+                if rivals is None:
+                    rivals = self.findRivals(piece, move.newPos, pins)
+                    rivalsForTarget[target] = rivals
+                disambiguation = self.getDisambiguation(move, rivals)
+            notations.append(
+                self.getAlgebraicNotation(move, disambiguation)
+                + self.getCheckSuffix(move)
             )
+        return notations
 
-        duplicateNotationMoves = self.duplicateMovesFromMoves(moves)
-        for duplicateMove in duplicateNotationMoves:
-            duplicateMove.notation = self.board.getAlgebraicNotationOfMoveWithRank( 
-                duplicateMove, short
-            )
+    # Any other piece of the same kind that attacks the target square could
+    # also move there, unless a pin holds it off the line to its king. Both
+    # moves land on the same square, so they answer a check equally well.
+    def findRivals(
+            self, piece: Piece, square: C, pins: dict[int, tuple[int, int]]
+    ) -> list[Piece]:
+        board = self.board
+        rivals = []
+        for attacker in board.attackersOf(square, piece.side):
+            if type(attacker) is not type(piece):
+                continue
+            x, y = attacker.position
+            pin = pins.get(y * 8 + x)
+            if pin is not None:
+                kx, ky = board.kings[piece.side].position
+                dx = square[0] - kx
+                dy = square[1] - ky
+                if (
+                        dx * pin[1] != dy * pin[0]
+                        or dx * pin[0] + dy * pin[1] <= 0
+                ):
+                    continue
+            rivals.append(attacker)
+        return rivals
 
-        duplicateNotationMoves = self.duplicateMovesFromMoves(moves)
-        for duplicateMove in duplicateNotationMoves:
-            duplicateMove.notation = self.board.getAlgebraicNotationOfMoveWithFileAndRank( 
-                duplicateMove, short
-            )
+    def getDisambiguation(self, move: Move, rivals: list[Piece]) -> str:
+        others = [
+            rival.position for rival in rivals if rival is not move.piece
+        ]
+        if not others:
+            return ''
+        x, y = move.oldPos
+        square = self.board.positionToHumanCoord(move.oldPos)
+        if all(otherX != x for otherX, otherY in others):
+            return square[0]
+        if all(otherY != y for otherX, otherY in others):
+            return square[1]
+        return square
 
-        return moves
+    # Only a move that gives check needs the opponent's replies generated to
+    # tell check from mate.
+    def getCheckSuffix(self, move: Move) -> str:
+        board = self.board
+        opponent = not move.piece.side
+        board.makeMove(move)
+        try:
+            if not board.isInCheck(opponent):
+                return ''
+            return '#' if not board.getLegalMoves(opponent) else '+'
+        finally:
+            board.undoLastMove()
 
-    def duplicateMovesFromMoves(self, moves: list[Move]) -> list[Move]:
-        return list(
-            filter(
-                lambda move: len(
-                    [m for m in moves if m.notation == move.notation]
-                )
-                > 1,
-                moves,
+    # The index is rebuilt whenever the board hands out a new legal move
+    # tuple. Undoing a move gives back the tuple of the position before it
+    # while that position is recent enough to be cached, so the index of a
+    # position survives a move made and undone on top of it.
+    def indexMoves(self, side: bool) -> None:
+        legalMoves = self.board.getLegalMoves(side)
+        if legalMoves is self.indexedMoves:
+            return
+        moves = [move.copy() for move in legalMoves]
+        disambiguations = self.findDisambiguations(moves)
+        index: dict[str, Move] = {}
+        for move in moves:
+            move.notation = self.getAlgebraicNotation(
+                move, disambiguations.get(move, '')
             )
-        )
+            index.setdefault(normalizeNotation(move.notation), move)
+        # A pawn capture may also leave out both ranks, and a piece may name
+        # the file or rank it starts from when that is not needed, as long as
+        # only one move fits. moveForShortAlgebraicNotation accepts the same.
+        partialMatches: dict[str, list[Move]] = {}
+        for move in moves:
+            for notation in self.notationVariants(move):
+                index.setdefault(notation, move)
+            for notation in self.partialNotations(move):
+                partialMatches.setdefault(notation, []).append(move)
+        for notation, matches in partialMatches.items():
+            if len(matches) == 1:
+                index.setdefault(notation, matches[0])
+        lowercaseIndex: dict[str, Move] = {}
+        for notation, move in index.items():
+            lowercaseIndex.setdefault(notation.lower(), move)
+
+        self.indexedMoves = legalMoves
+        self.notationIndex = index
+        self.lowercaseIndex = lowercaseIndex
+
+    # Pieces of one kind that reach the same square are told apart by file,
+    # then by rank, then by both, in a single pass over the moves.
+    def findDisambiguations(self, moves: list[Move]) -> dict[Move, str]:
+        groups: dict[tuple[str, tuple[int, int]], list[Move]] = {}
+        for move in moves:
+            if (
+                    type(move.piece) is Pawn or move.kingsideCastle
+                    or move.queensideCastle
+            ):
+                continue
+            groups.setdefault(
+                (move.piece.stringRep, move.newPos), []
+            ).append(move)
+
+        disambiguations: dict[Move, str] = {}
+        for group in groups.values():
+            if len(group) < 2:
+                continue
+            for move in group:
+                x, y = move.oldPos
+                others = [other.oldPos for other in group if other is not move]
+                square = self.board.positionToHumanCoord(move.oldPos)
+                if all(otherX != x for otherX, otherY in others):
+                    disambiguations[move] = square[0]
+                elif all(otherY != y for otherX, otherY in others):
+                    disambiguations[move] = square[1]
+                else:
+                    disambiguations[move] = square
+        return disambiguations
+
+    def getAlgebraicNotation(
+            self, move: Move, disambiguation: str = ''
+    ) -> str:
+        if move.queensideCastle:
+            return '0-0-0'
+        if move.kingsideCastle:
+            return '0-0'
+        notation = ''
+        if type(move.piece) is Pawn:
+            if move.pieceToCapture is not None:
+                notation += self.board.fileOfPiece(move.piece) + 'x'
+        else:
+            notation += move.piece.stringRep + disambiguation
+            if move.pieceToCapture is not None:
+                notation += 'x'
+        notation += self.board.positionToHumanCoord(move.newPos)
+        if move.promotion:
+            notation += '=' + move.promotion.stringRep
+        return notation
+
+    # Long algebraic and coordinate forms name the starting square, so they
+    # never need disambiguating.
+    def notationVariants(self, move: Move) -> list[str]:
+        newSquare = self.board.positionToHumanCoord(move.newPos)
+        promotion = move.promotion.stringRep if move.promotion else ''
+        coordinate = self.board.getCoordinateNotationOfMove(move)
+        if type(move.piece) is not Pawn:
+            return [move.piece.stringRep + coordinate, coordinate]
+        variants = [coordinate, 'P' + coordinate]
+        if move.pieceToCapture is None:
+            variants.append('P' + newSquare + promotion)
+        return variants
+
+    def partialNotations(self, move: Move) -> list[str]:
+        piece = move.piece
+        if type(piece) is Pawn:
+            if move.pieceToCapture is None:
+                return []
+            return [self.getFileCaptureNotation(move)]
+        if move.kingsideCastle or move.queensideCastle:
+            return []
+        oldSquare = self.board.positionToHumanCoord(move.oldPos)
+        newSquare = self.board.positionToHumanCoord(move.newPos)
+        return [
+            piece.stringRep + oldSquare[0] + newSquare,
+            piece.stringRep + oldSquare[1] + newSquare,
+        ]
+
+    def getFileCaptureNotation(self, move: Move) -> str:
+        notation = self.board.fileOfPiece(move.piece)
+        notation += self.board.positionToHumanCoord(move.newPos)[0]
+        if move.promotion:
+            notation += move.promotion.stringRep
+        return notation
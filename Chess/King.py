@@ -14,6 +14,7 @@ BLACK = False
 
 
 class King(Piece):
+    __slots__ = ()
     stringRep = 'K'
     value = 100
 
@@ -44,9 +45,10 @@ class King(Piece):
                 elif pieceAtNewPos.side != self.side:
                     yield Move(self, newPos, pieceToCapture=pieceAtNewPos)
 
-       
+        yield from self.getCastlingMoves()
+
+    def getCastlingMoves(self) -> Iterator[Move]:
         if self.movesMade == 0:
-            inCheck = False
             kingsideCastleBlocked = False
             queensideCastleBlocked = False
             kingsideCastleCheck = False
@@ -76,24 +78,6 @@ class King(Piece):
             if kingsideCastleBlocked and queensideCastleBlocked:
                 return
 
-            otherSideMoves = self.board.getAllMovesUnfiltered(
-                not self.side, includeKing=False
-            )
-            for move in otherSideMoves:
-                if move.newPos == self.position:
-                    inCheck = True
-                    break
-                if (
-                        move.newPos == self.position + C(1, 0)
-                        or move.newPos == self.position + C(2, 0)
-                ):
-                    kingsideCastleCheck = True
-                if (
-                        move.newPos == self.position - C(1, 0)
-                        or move.newPos == self.position - C(2, 0)
-                ):
-                    queensideCastleCheck = True
-
             kingsideRookPos = self.position + C(3, 0)
             kingsideRook = (
                 self.board.pieceAtPosition(kingsideRookPos)
@@ -118,6 +102,21 @@ class King(Piece):
             ):
                 queensideRookMoved = False
 
+            board = self.board
+            inCheck = board.isSquareAttacked(self.position, not self.side)
+            if not kingsideCastleBlocked and not kingsideRookMoved:
+                kingsideCastleCheck = board.isSquareAttacked(
+                    self.position + C(1, 0), not self.side
+                ) or board.isSquareAttacked(
+                    self.position + C(2, 0), not self.side
+                )
+            if not queensideCastleBlocked and not queensideRookMoved:
+                queensideCastleCheck = board.isSquareAttacked(
+                    self.position - C(1, 0), not self.side
+                ) or board.isSquareAttacked(
+                    self.position - C(2, 0), not self.side
+                )
+
             if not inCheck:
                 if (
                         not kingsideCastleBlocked and not kingsideCastleCheck
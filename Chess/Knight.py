@@ -14,6 +14,7 @@ BLACK = False
 
 
 class Knight(Piece):
+    __slots__ = ()
     stringRep = 'N'
     value = 3
 
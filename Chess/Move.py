@@ -6,8 +6,24 @@ if TYPE_CHECKING:
     from Coordinate import Coordinate as C
     from Piece import Piece
 
+# Promotion piece numbers follow the Polyglot move layout: to square in bits
+# 0-5, from square in bits 6-11 and the promotion piece in bits 12-14.
+PROMOTION_CODES = {'N': 1, 'B': 2, 'R': 3, 'Q': 4}
+
+# Which moves a generator should produce: everything, only captures and
+# promotions, or only the remaining quiet moves.
+ALL_MOVES = 0
+TACTICAL_MOVES = 1
+QUIET_MOVES = 2
+
 
 class Move:
+    __slots__ = (
+        'notation', 'checkmate', 'kingsideCastle', 'queensideCastle',
+        'promotion', 'passant', 'stalemate', 'piece', 'oldPos', 'newPos',
+        'pieceToCapture', 'specialMovePiece', 'rookMove',
+    )
+
     def __init__(
             self,
             piece: Piece,
@@ -18,7 +34,7 @@ class Move:
         self.checkmate = False
         self.kingsideCastle = False
         self.queensideCastle = False
-        self.promotion = False
+        self.promotion: Optional[type[Piece]] = None
         self.passant = False
         self.stalemate = False
 
@@ -29,6 +45,25 @@ class Move:
         self.specialMovePiece = None
         self.rookMove = None
 
+    def copy(self) -> Move:
+        move = Move.__new__(Move)
+        for name in Move.__slots__:
+            setattr(move, name, getattr(self, name))
+        return move
+
+    @property
+    def isTactical(self) -> bool:
+        return self.pieceToCapture is not None or self.promotion is not None
+
+    @property
+    def code(self) -> int:
+        oldX, oldY = self.oldPos
+        newX, newY = self.newPos
+        code = (newY * 8 + newX) | (oldY * 8 + oldX) << 6
+        if self.promotion:
+            code |= PROMOTION_CODES[self.promotion.stringRep] << 12
+        return code
+
     def __str__(self) -> str:
         displayString = 'Old pos : ' + str(self.oldPos) + \
                         ' -- New pos : ' + str(self.newPos)
@@ -44,21 +79,10 @@ class Move:
     def __eq__(self, other: object) -> bool:
         if not isinstance(other, Move):
             return NotImplemented
-        if (
+        return (
                 self.oldPos == other.oldPos and self.newPos == other.newPos
-                and self.specialMovePiece == other.specialMovePiece
-        ):
-            if not self.specialMovePiece:
-                return True
-            if (
-                    self.specialMovePiece
-                    and self.specialMovePiece == other.specialMovePiece
-            ):
-                return True
-            else:
-                return False
-        else:
-            return False
+                and self.promotion is other.promotion
+        )
 
     def __hash__(self) -> int:
         return hash((self.oldPos, self.newPos))
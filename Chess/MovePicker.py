@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Iterator, Optional
+
+from Move import Move
+
+if TYPE_CHECKING:
+    from Board import Board
+    from Piece import Piece
+
+KILLER_SLOTS = 2
+
+
+# Most valuable victim first, least valuable attacker breaking ties; a
+# promotion counts the piece it creates as captured material.
+def captureOrder(move: Move) -> int:
+    score = 0
+    if move.pieceToCapture is not None:
+        score += 10 * move.pieceToCapture.value
+    if move.promotion:
+        score += 10 * move.promotion.value
+    return score - move.piece.value
+
+
+def findMove(moves: list[Move], code: int) -> Optional[Move]:
+    for move in moves:
+        if move.code == code:
+            return move
+    return None
+
+
+class MoveHistory:
+    def __init__(self) -> None:
+        self.clear()
+
+    def clear(self) -> None:
+        self.killers: list[list[int]] = []
+        # Quiet moves are scored by side and from/to squares, which are the
+        # low twelve bits of a move code.
+        self.scores: dict[bool, list[int]] = {
+            True: [0] * 4096, False: [0] * 4096
+        }
+
+    def killersAt(self, ply: int) -> list[int]:
+        while len(self.killers) <= ply:
+            self.killers.append([])
+        return self.killers[ply]
+
+    def recordCutoff(self, move: Move, depth: int, ply: int) -> None:
+        if move.isTactical:
+            return
+        code = move.code
+        killers = self.killersAt(ply)
+        if code not in killers:
+            killers.insert(0, code)
+            del killers[KILLER_SLOTS:]
+        self.scores[move.piece.side][code & 0xFFF] += depth * depth
+
+
+class MovePicker:
+    def __init__(
+            self, board: Board, history: MoveHistory, ply: int,
+            tableMoveCode: Optional[int] = None
+    ) -> None:
+        self.board = board
+        self.history = history
+        self.ply = ply
+        self.tableMoveCode = tableMoveCode
+        self.unfilteredQuiets: Optional[list[Move]] = None
+        self.checkersAndPins: Optional[
+            tuple[list[Piece], dict[int, tuple[int, int]]]
+        ] = None
+
+    # Mailbox pieces generate captures and quiet moves together, so the moves
+    # are generated once and each stage is checked for legality only when the
+    # search reaches it. The bitboards generate each kind on its own.
+    def getCaptures(self) -> list[Move]:
+        board = self.board
+        side = board.currentSide
+        if board.bitboards is not None or side in board.legalMovesCache:
+            return board.getLegalCaptures(side)
+        tactical = []
+        self.unfilteredQuiets = []
+        for move in board.getAllMovesUnfiltered(side):
+            if move.isTactical:
+                tactical.append(move)
+            else:
+                self.unfilteredQuiets.append(move)
+        if side in board.kings:
+            self.checkersAndPins = board.getCheckersAndPins(side)
+        return board.filterLegalMoves(side, tactical, self.checkersAndPins)
+
+    def getQuiets(self) -> list[Move]:
+        board = self.board
+        if self.unfilteredQuiets is None:
+            return board.getLegalQuiets(board.currentSide)
+        return board.filterLegalMoves(
+            board.currentSide, self.unfilteredQuiets, self.checkersAndPins
+        )
+
+    def __iter__(self) -> Iterator[Move]:
+        side = self.board.currentSide
+        tactical = self.getCaptures()
+        quiets: Optional[list[Move]] = None
+
+        # The hash move is usually enough for a cutoff, so the stages after
+        # it are only generated when the search asks for more moves.
+        tableMove = None
+        if self.tableMoveCode is not None:
+            tableMove = findMove(tactical, self.tableMoveCode)
+            if tableMove is None:
+                quiets = self.getQuiets()
+                tableMove = findMove(quiets, self.tableMoveCode)
+            if tableMove is not None:
+                yield tableMove
+
+        captures = [
+            move for move in tactical
+            if move.pieceToCapture is not None and move is not tableMove
+        ]
+        captures.sort(key=captureOrder, reverse=True)
+        yield from captures
+
+        promotions = [
+            move for move in tactical
+            if move.pieceToCapture is None and move is not tableMove
+        ]
+        promotions.sort(key=captureOrder, reverse=True)
+        yield from promotions
+
+        if quiets is None:
+            quiets = self.getQuiets()
+        played = {tableMove} if tableMove is not None else set()
+        for code in list(self.history.killersAt(self.ply)):
+            killer = findMove(quiets, code)
+            if killer is not None and killer not in played:
+                played.add(killer)
+                yield killer
+
+        scores = self.history.scores[side]
+        quiets = [move for move in quiets if move not in played]
+        quiets.sort(key=lambda move: scores[move.code & 0xFFF], reverse=True)
+        yield from quiets
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import argparse
+import mmap
+import random
+import struct
+import sys
+from typing import Iterable, NamedTuple, Optional
+
+from Board import Board
+from InputParser import InputParser
+from Move import Move
+
+# Records use the Polyglot layout: a big-endian 64-bit position key, a 16-bit
+# move code, a 16-bit weight and a 32-bit learn field, sorted by key. The key
+# is this engine's Zobrist key rather than the Polyglot one, so books have to
+# be built with this module.
+ENTRY_FORMAT = struct.Struct('>QHHI')
+KEY_FORMAT = struct.Struct('>Q')
+ENTRY_SIZE = ENTRY_FORMAT.size
+MAX_WEIGHT = 0xFFFF
+
+
+class BookEntry(NamedTuple):
+    key: int
+    moveCode: int
+    weight: int
+    learn: int
+
+
+class OpeningBook:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.file = open(path, 'rb')
+        self.data: Optional[mmap.mmap] = None
+        self.entryCount = 0
+        # An empty file cannot be mapped; it is simply a book with no moves.
+        if self.file.seek(0, 2) >= ENTRY_SIZE:
+            self.data = mmap.mmap(
+                self.file.fileno(), 0, access=mmap.ACCESS_READ
+            )
+            self.entryCount = len(self.data) // ENTRY_SIZE
+
+    def close(self) -> None:
+        if self.data is not None:
+            self.data.close()
+            self.data = None
+        self.file.close()
+
+    def keyAt(self, index: int) -> int:
+        return KEY_FORMAT.unpack_from(self.data, index * ENTRY_SIZE)[0]
+
+    def getEntries(self, key: int) -> list[BookEntry]:
+        if self.data is None:
+            return []
+        low, high = 0, self.entryCount
+        while low < high:
+            middle = (low + high) // 2
+            if self.keyAt(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        entries = []
+        for index in range(low, self.entryCount):
+            entry = BookEntry(
+                *ENTRY_FORMAT.unpack_from(self.data, index * ENTRY_SIZE)
+            )
+            if entry.key != key:
+                break
+            entries.append(entry)
+        return entries
+
+    def getMoves(self, board: Board) -> list[tuple[Move, int]]:
+        moves = []
+        for entry in self.getEntries(board.zobristKey):
+            move = board.getMoveForCode(entry.moveCode)
+            if move is not None and entry.weight > 0:
+                moves.append((move, entry.weight))
+        return moves
+
+    def chooseMove(
+            self, board: Board, rng: random.Random = random
+    ) -> Optional[Move]:
+        moves = self.getMoves(board)
+        if not moves:
+            return None
+        move = rng.choices(
+            [move for move, weight in moves],
+            weights=[weight for move, weight in moves],
+        )[0]
+        return move.copy()
+
+
+def buildBookEntries(
+        lines: Iterable[str], maxPlies: int = 16
+) -> list[BookEntry]:
+    weights: dict[tuple[int, int], int] = {}
+    for line in lines:
+        notations = line.split('#')[0].split()
+        if not notations:
+            continue
+        board = Board()
+        for notation in notations[:maxPlies]:
+            move = InputParser(board, board.currentSide).parse(notation)
+            entryKey = (board.zobristKey, move.code)
+            weights[entryKey] = min(MAX_WEIGHT, weights.get(entryKey, 0) + 1)
+            board.makeMove(move)
+    return [
+        BookEntry(key, moveCode, weight, 0)
+        for (key, moveCode), weight in sorted(weights.items())
+    ]
+
+
+def writeBook(path: str, entries: Iterable[BookEntry]) -> int:
+    count = 0
+    with open(path, 'wb') as bookFile:
+        for entry in sorted(entries):
+            bookFile.write(ENTRY_FORMAT.pack(*entry))
+            count += 1
+    return count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Build or probe a book.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser(
+        'build', help='build a book from one opening line per text line'
+    )
+    build.add_argument('lines')
+    build.add_argument('book')
+    build.add_argument('--plies', type=int, default=16)
+    probe = commands.add_parser('probe', help='list the book moves')
+    probe.add_argument('book')
+    probe.add_argument('--fen')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        with open(args.lines) as linesFile:
+            entries = buildBookEntries(linesFile, args.plies)
+        count = writeBook(args.book, entries)
+        print('%d entries written to %s' % (count, args.book))
+        return
+
+    board = Board(fen=args.fen) if args.fen else Board()
+    book = OpeningBook(args.book)
+    try:
+        moves = book.getMoves(board)
+    finally:
+        book.close()
+    if not moves:
+        print('position not in book')
+        sys.exit(1)
+    total = sum(weight for move, weight in moves)
+    for move, weight in sorted(moves, key=lambda item: -item[1]):
+        print('%s %5d %5.1f%%' % (
+            board.getCoordinateNotationOfMove(move), weight,
+            100 * weight / total,
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import argparse
+import re
+import sys
+import time
+from typing import Iterable, Iterator, NamedTuple, Optional, TextIO
+
+from Board import STARTING_FEN, Board
+from InputParser import InputParser
+from Move import Move
+
+WHITE = True
+
+RESULTS = ('1-0', '0-1', '1/2-1/2', '*')
+SEVEN_TAG_ROSTER = (
+    ('Event', '?'), ('Site', '?'), ('Date', '????.??.??'), ('Round', '?'),
+    ('White', '?'), ('Black', '?'), ('Result', '*'),
+)
+LINE_LENGTH = 79
+
+TAG_PATTERN = re.compile(r'\[\s*(\w+)\s+"((?:[^"\\]|\\.)*)"\s*\]')
+# Comments, variations, annotation glyphs and move numbers are recognised
+# only so they can be skipped; everything else is a move or a result.
+TOKEN_PATTERN = re.compile(
+    r'\{[^}]*\}|\{.*|;.*|[()]|\$\d+|\d+\.+|[^\s.{}();$]+'
+)
+
+
+class PgnGame(NamedTuple):
+    headers: dict[str, str]
+    moves: list[str]
+    result: str
+
+
+# Lines are consumed one at a time, so a file of any size can be read by
+# passing the open file object.
+def readGames(lines: Iterable[str]) -> Iterator[PgnGame]:
+    headers: dict[str, str] = {}
+    moves: list[str] = []
+    inComment = False
+    variationDepth = 0
+    for line in lines:
+        if inComment:
+            end = line.find('}')
+            if end < 0:
+                continue
+            line = line[end + 1:]
+            inComment = False
+        elif line.startswith('%'):
+            continue
+        stripped = line.strip()
+        if stripped.startswith('[') and variationDepth == 0:
+            # A game cut off without a result ends at the next tag section.
+            if moves:
+                yield PgnGame(headers, moves, headers.get('Result', '*'))
+                headers, moves = {}, []
+            match = TAG_PATTERN.match(stripped)
+            if match is not None:
+                headers[match.group(1)] = re.sub(
+                    r'\\(.)', r'\1', match.group(2)
+                )
+            continue
+
+        for match in TOKEN_PATTERN.finditer(line):
+            token = match.group()
+            first = token[0]
+            if first == '{':
+                inComment = not token.endswith('}')
+            elif first == '(':
+                variationDepth += 1
+            elif first == ')':
+                variationDepth = max(0, variationDepth - 1)
+            elif (
+                    variationDepth or first == ';' or first == '$'
+                    or token.endswith('.')
+            ):
+                continue
+            elif token in RESULTS:
+                yield PgnGame(headers, moves, token)
+                headers, moves = {}, []
+            else:
+                moves.append(token)
+    if headers or moves:
+        yield PgnGame(headers, moves, headers.get('Result', '*'))
+
+
+def startingBoard(game: PgnGame, useBitboards: bool = False) -> Board:
+    return Board.fromFEN(game.headers.get('FEN', STARTING_FEN), useBitboards)
+
+
+# Each move is yielded before it is played, while the board still shows the
+# position it was played from.
+def replayMoves(board: Board, notations: Iterable[str]) -> Iterator[Move]:
+    parser = InputParser(board, board.currentSide)
+    for ply, notation in enumerate(notations):
+        parser.side = board.currentSide
+        try:
+            move = parser.moveForShortAlgebraicNotation(notation)
+        except ValueError as error:
+            raise ValueError('%s at ply %d' % (error, ply + 1)) from None
+        yield move
+        board.makeMove(move)
+
+
+def replayGame(game: PgnGame, useBitboards: bool = False) -> Board:
+    board = startingBoard(game, useBitboards)
+    for _ in replayMoves(board, game.moves):
+        pass
+    return board
+
+
+def gameResult(board: Board) -> str:
+    if board.isCheckmate():
+        return '0-1' if board.currentSide == WHITE else '1-0'
+    if (
+            board.isStalemate() or board.isThreefoldRepetition()
+            or board.isFiftyMoveDraw() or board.noMatingMaterial()
+    ):
+        return '1/2-1/2'
+    return '*'
+
+
+# PGN writes castling with the letter O where this engine uses zeros.
+def pgnNotation(notation: str) -> str:
+    if notation.startswith('0'):
+        return notation.replace('0', 'O')
+    return notation
+
+
+# Moves are looked up again by code while they are played, because a
+# promotion creates a new piece each time it is made and later moves would
+# refer to the old one. The board is left after the last move that could be
+# played.
+def playVariation(board: Board, codes: Iterable[int]) -> list[str]:
+    parser = InputParser(board, board.currentSide)
+    notations = []
+    for code in codes:
+        move = board.getMoveForCode(code)
+        if move is None:
+            break
+        notations.append(parser.notationForMove(move))
+        board.makeMove(move)
+    return notations
+
+
+# The board is wound back to where its history starts so every move can be
+# written in context, then played forward again to the same position.
+def getMoveNotations(board: Board) -> tuple[str, int, list[str]]:
+    codes = []
+    while board.history and board.history[-1].key is not None:
+        codes.append(board.history[-1].move.code)
+        board.undoLastMove()
+    codes.reverse()
+    startFen = board.toFEN()
+    startPly = board.movesMade
+    notations = [
+        pgnNotation(notation) for notation in playVariation(board, codes)
+    ]
+    return startFen, startPly, notations
+
+
+def formatGame(
+        board: Board, headers: Optional[dict[str, str]] = None,
+        result: Optional[str] = None
+) -> str:
+    headers = dict(headers or {})
+    if result is None:
+        result = gameResult(board)
+    startFen, startPly, notations = getMoveNotations(board)
+    tags = {name: headers.pop(name, value) for name, value in SEVEN_TAG_ROSTER}
+    tags['Result'] = result
+    if startFen != STARTING_FEN:
+        tags['SetUp'] = '1'
+        tags['FEN'] = startFen
+    tags.update(headers)
+    lines = [
+        '[%s "%s"]' % (
+            name, value.replace('\\', '\\\\').replace('"', '\\"')
+        )
+        for name, value in tags.items()
+    ]
+    lines.append('')
+
+    tokens = []
+    for index, notation in enumerate(notations):
+        ply = startPly + index
+        if ply % 2 == 0:
+            tokens.append('%d. %s' % (ply // 2 + 1, notation))
+        elif index == 0:
+            tokens.append('%d... %s' % (ply // 2 + 1, notation))
+        else:
+            tokens.append(notation)
+    tokens.append(result)
+    line = ''
+    for token in tokens:
+        if line and len(line) + 1 + len(token) > LINE_LENGTH:
+            lines.append(line)
+            line = token
+        else:
+            line = line + ' ' + token if line else token
+    lines.append(line)
+    return '\n'.join(lines) + '\n'
+
+
+def writeGame(
+        pgnFile: TextIO, board: Board,
+        headers: Optional[dict[str, str]] = None,
+        result: Optional[str] = None
+) -> None:
+    pgnFile.write(formatGame(board, headers, result))
+    pgnFile.write('\n')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description='Read a PGN file and replay every game.'
+    )
+    parser.add_argument('pgn')
+    parser.add_argument(
+        '--no-replay', action='store_true',
+        help='only parse the games, without playing the moves',
+    )
+    parser.add_argument(
+        '--output', help='write the replayed games back out as PGN'
+    )
+    parser.add_argument('--bitboards', action='store_true')
+    args = parser.parse_args()
+
+    games = moves = errors = 0
+    output = open(args.output, 'w') if args.output else None
+    start = time.perf_counter()
+    try:
+        with open(args.pgn, errors='replace') as pgnFile:
+            for game in readGames(pgnFile):
+                games += 1
+                moves += len(game.moves)
+                if args.no_replay:
+                    continue
+                try:
+                    board = replayGame(game, args.bitboards)
+                except ValueError as error:
+                    errors += 1
+                    print('game %d: %s' % (games, error), file=sys.stderr)
+                    continue
+                if output is not None:
+                    writeGame(output, board, game.headers, game.result)
+    finally:
+        if output is not None:
+            output.close()
+    elapsed = time.perf_counter() - start
+    print(
+        'games %d  moves %d  errors %d  time %.3fs  games/s %.1f  '
+        'moves/s %.0f' % (
+            games, moves, errors, elapsed, games / max(elapsed, 1e-9),
+            moves / max(elapsed, 1e-9),
+        )
+    )
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == '__main__':
+    main()
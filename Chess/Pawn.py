@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Iterator
+from typing import TYPE_CHECKING, Iterator, Optional
 
 from Bishop import Bishop
 from Coordinate import Coordinate as C
@@ -15,9 +15,11 @@ if TYPE_CHECKING:
 
 WHITE = True
 BLACK = False
+PROMOTION_PIECES = (Rook, Knight, Bishop, Queen)
 
 
 class Pawn(Piece):
+    __slots__ = ()
     stringRep = '▲'
     value = 1
 
@@ -39,17 +41,7 @@ class Pawn(Piece):
             if self.board.pieceAtPosition(advanceOnePosition) is None:
                 col = advanceOnePosition[1]
                 if col == 7 or col == 0:
-                    piecesForPromotion = [
-                        Rook(self.board, self.side, advanceOnePosition),
-                        Knight(self.board, self.side, advanceOnePosition),
-                        Bishop(self.board, self.side, advanceOnePosition),
-                        Queen(self.board, self.side, advanceOnePosition),
-                    ]
-                    for piece in piecesForPromotion:
-                        move = Move(self, advanceOnePosition)
-                        move.promotion = True
-                        move.specialMovePiece = piece 
-                        yield move
+                    yield from self.getPromotionMoves(advanceOnePosition)
                 else:
                     yield Move(self, advanceOnePosition)
 
@@ -80,25 +72,25 @@ class Pawn(Piece):
                     col = newPosition[1]
                    
                     if col == 7 or col == 0:
-                        piecesForPromotion = [
-                            Rook(self.board, self.side, newPosition),
-                            Knight(self.board, self.side, newPosition),
-                            Bishop(self.board, self.side, newPosition),
-                            Queen(self.board, self.side, newPosition),
-                        ]
-                        for piece in piecesForPromotion:
-                            move = Move(
-                                self, newPosition, pieceToCapture=pieceToTake
-                            )
-                            move.promotion = True
-                            move.specialMovePiece = piece 
-                            yield move
+                        yield from self.getPromotionMoves(
+                            newPosition, pieceToTake
+                        )
                     else:
                         yield Move(
                             self, newPosition, pieceToCapture=pieceToTake
                         )
 
-       
+        yield from self.getPassantMoves()
+
+    def getPromotionMoves(
+            self, newPosition: C, pieceToTake: Optional[Piece] = None
+    ) -> Iterator[Move]:
+        for pieceClass in PROMOTION_PIECES:
+            move = Move(self, newPosition, pieceToCapture=pieceToTake)
+            move.promotion = pieceClass
+            yield move
+
+    def getPassantMoves(self) -> Iterator[Move]:
         movements = (
             [C(1, 1), C(-1, 1)]
             if self.side == WHITE
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from typing import NamedTuple
+
+from Board import STARTING_FEN, Board
+
+WHITE = True
+BLACK = False
+
+
+class PerftPosition(NamedTuple):
+    name: str
+    fen: str
+    nodes: list[int]
+
+
+REFERENCE_POSITIONS = [
+    PerftPosition(
+        'initial',
+        STARTING_FEN,
+        [20, 400, 8902, 197281, 4865609],
+    ),
+    PerftPosition(
+        'kiwipete',
+        'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+        [48, 2039, 97862, 4085603],
+    ),
+    PerftPosition(
+        'passant',
+        '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+        [14, 191, 2812, 43238, 674624],
+    ),
+    PerftPosition(
+        'promotion',
+        'r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1',
+        [6, 264, 9467, 422333],
+    ),
+    PerftPosition(
+        'promotionCastle',
+        'rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8',
+        [44, 1486, 62379, 2103487],
+    ),
+]
+
+
+def perft(board: Board, depth: int) -> int:
+    if depth == 0:
+        return 1
+    moves = board.getLegalMoves(board.currentSide)
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        board.makeMove(move)
+        nodes += perft(board, depth - 1)
+        board.undoLastMove()
+    return nodes
+
+
+def divide(board: Board, depth: int) -> dict[str, int]:
+    counts = {}
+    for move in board.getLegalMoves(board.currentSide):
+        notation = board.getCoordinateNotationOfMove(move).lower()
+        board.makeMove(move)
+        counts[notation] = perft(board, depth - 1)
+        board.undoLastMove()
+    return counts
+
+
+def timedPerft(board: Board, depth: int) -> tuple[int, float]:
+    start = time.perf_counter()
+    nodes = perft(board, depth)
+    return nodes, time.perf_counter() - start
+
+
+def formatResult(name: str, depth: int, nodes: int, elapsed: float) -> str:
+    nps = nodes / elapsed if elapsed > 0 else 0
+    return '%-16s depth %d  nodes %10d  time %8.3fs  nps %10.0f' % (
+        name, depth, nodes, elapsed, nps
+    )
+
+
+def runSuite(
+        maxDepth: int, useBitboards: bool, verifyZobrist: bool = False
+) -> bool:
+    passed = True
+    for position in REFERENCE_POSITIONS:
+        for depth in range(1, min(maxDepth, len(position.nodes)) + 1):
+            board = Board.fromFEN(position.fen, useBitboards)
+            board.verifyZobrist = verifyZobrist
+            nodes, elapsed = timedPerft(board, depth)
+            expected = position.nodes[depth - 1]
+            status = 'ok' if nodes == expected else 'FAIL (expected %d)' % (
+                expected
+            )
+            print(formatResult(position.name, depth, nodes, elapsed), status)
+            passed = passed and nodes == expected
+    return passed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description='Count move-generation leaf nodes (perft).'
+    )
+    parser.add_argument('depth', type=int, nargs='?', default=3)
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument(
+        '--position',
+        choices=[position.name for position in REFERENCE_POSITIONS],
+        default='initial',
+    )
+    source.add_argument('--fen')
+    source.add_argument(
+        '--suite', action='store_true',
+        help='check every reference position up to DEPTH',
+    )
+    parser.add_argument(
+        '--divide', action='store_true',
+        help='print the node count below each root move',
+    )
+    parser.add_argument('--bitboards', action='store_true')
+    parser.add_argument(
+        '--verify-zobrist', action='store_true',
+        help='recompute the position key after every move and compare',
+    )
+    args = parser.parse_args()
+
+    if args.suite:
+        passed = runSuite(args.depth, args.bitboards, args.verify_zobrist)
+        sys.exit(0 if passed else 1)
+
+    name = args.position
+    fen = args.fen
+    if fen is None:
+        fen = next(p.fen for p in REFERENCE_POSITIONS if p.name == name)
+    else:
+        name = 'fen'
+    board = Board.fromFEN(fen, args.bitboards)
+    board.verifyZobrist = args.verify_zobrist
+
+    if args.divide:
+        start = time.perf_counter()
+        counts = divide(board, args.depth)
+        elapsed = time.perf_counter() - start
+        for notation in sorted(counts):
+            print('%s: %d' % (notation, counts[notation]))
+        print(formatResult(name, args.depth, sum(counts.values()), elapsed))
+    else:
+        nodes, elapsed = timedPerft(board, args.depth)
+        print(formatResult(name, args.depth, nodes, elapsed))
+
+
+if __name__ == '__main__':
+    main()
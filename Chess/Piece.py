@@ -15,6 +15,7 @@ Y = 1
 
 
 class Piece:
+    __slots__ = ('board', 'side', 'position', 'movesMade')
     stringRep: str
     value: int
 
@@ -50,16 +51,5 @@ class Piece:
                         yield Move(self, newPos, pieceToCapture=pieceAtNewPos)
                     return
 
-    def __eq__(self, other: object) -> bool:
-        if not isinstance(other, Piece):
-            return NotImplemented
-        if (
-                self.board == other.board and self.side == other.side
-                and self.position == other.position
-                and self.__class__ == other.__class__
-        ):
-            return True
-        return False
-
     def getPossibleMoves(self) -> Iterator[Move]:
         pass
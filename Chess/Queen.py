@@ -14,6 +14,7 @@ BLACK = False
 
 
 class Queen(Piece):
+    __slots__ = ()
     stringRep = 'Q'
     value = 9
 
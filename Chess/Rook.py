@@ -14,6 +14,7 @@ BLACK = False
 
 
 class Rook(Piece):
+    __slots__ = ()
     stringRep = 'R'
     value = 5
 
@@ -0,0 +1,711 @@
+from __future__ import annotations
+
+import argparse
+import itertools
+import mmap
+import os
+import struct
+import sys
+import time
+from typing import IO, TYPE_CHECKING, NamedTuple, Optional, Union
+
+from Bitboard import (
+    BISHOP,
+    KING,
+    KING_ATTACKS,
+    KIND_OF_REP,
+    KNIGHT,
+    KNIGHT_ATTACKS,
+    PAWN,
+    PAWN_ATTACKS,
+    QUEEN,
+    ROOK,
+    bishopAttacks,
+    rookAttacks,
+)
+from Board import Board
+
+if TYPE_CHECKING:
+    from Move import Move
+
+WHITE = True
+BLACK = False
+
+MAX_PIECES = 4
+PIECE_LETTERS = 'PNBRQK'
+PIECE_VALUES = [1, 3, 3, 5, 9, 0]
+PROMOTION_KINDS = (QUEEN, ROOK, BISHOP, KNIGHT)
+
+# Every position takes one byte: DRAW, ILLEGAL, or one more than the number
+# of plies to mate. An odd number of plies is a win for the side to move and
+# an even number a loss, so 1 means the side to move is already mated.
+DRAW = 0
+ILLEGAL = 255
+UNKNOWN = 254
+MAX_PLIES = UNKNOWN - 2
+
+HEADER_FORMAT = struct.Struct('>4sI')
+MAGIC = b'CTB1'
+
+# The eight symmetries of the board, of which only the file mirror keeps
+# pawns moving the right way.
+SYMMETRIES = [
+    lambda x, y: (x, y),
+    lambda x, y: (7 - x, y),
+    lambda x, y: (x, 7 - y),
+    lambda x, y: (7 - x, 7 - y),
+    lambda x, y: (y, x),
+    lambda x, y: (7 - y, x),
+    lambda x, y: (y, 7 - x),
+    lambda x, y: (7 - y, 7 - x),
+]
+SQUARE_MAPS = [
+    [
+        symmetry(square % 8, square // 8)[1] * 8
+        + symmetry(square % 8, square // 8)[0]
+        for square in range(64)
+    ]
+    for symmetry in SYMMETRIES
+]
+
+Piece = tuple[bool, int, int]
+
+
+class ProbeResult(NamedTuple):
+    wdl: int
+    plies: int
+
+
+def isWin(value: int) -> bool:
+    return value < UNKNOWN and value != DRAW and value & 1 == 0
+
+
+def isLoss(value: int) -> bool:
+    return value < UNKNOWN and value & 1 == 1
+
+
+def resultForValue(value: int) -> ProbeResult:
+    if isWin(value):
+        return ProbeResult(1, value - 1)
+    if isLoss(value):
+        return ProbeResult(-1, value - 1)
+    return ProbeResult(0, 0)
+
+
+def sideLetters(kinds: list[int]) -> str:
+    return ''.join(PIECE_LETTERS[kind] for kind in sorted(kinds, reverse=True))
+
+
+def strength(kinds: list[int]) -> tuple[int, list[int]]:
+    total = sum(PIECE_VALUES[kind] for kind in kinds)
+    return total, sorted(kinds, reverse=True)
+
+
+# Tables are stored with the stronger side as white; the returned flag tells
+# whether the colours have to be swapped to look a position up.
+def canonicalSignature(
+        whiteKinds: list[int], blackKinds: list[int]
+) -> tuple[str, bool]:
+    if strength(whiteKinds) >= strength(blackKinds):
+        return sideLetters(whiteKinds) + 'v' + sideLetters(blackKinds), False
+    return sideLetters(blackKinds) + 'v' + sideLetters(whiteKinds), True
+
+
+def isSupported(signature: str) -> bool:
+    strong, weak = signature.split('v')
+    # With pawns on both sides en passant captures become possible, which
+    # the tables do not track.
+    return (
+        len(strong) + len(weak) <= MAX_PIECES
+        and not ('P' in strong and 'P' in weak)
+    )
+
+
+def allSignatures(pieceCount: int) -> list[str]:
+    signatures = set()
+    kinds = [PAWN, KNIGHT, BISHOP, ROOK, QUEEN]
+    for extra in itertools.combinations_with_replacement(
+            kinds, pieceCount - 2
+    ):
+        for whiteCount in range(len(extra) + 1):
+            for whitePieces in itertools.combinations(extra, whiteCount):
+                blackPieces = list(extra)
+                for kind in whitePieces:
+                    blackPieces.remove(kind)
+                signature, flip = canonicalSignature(
+                    [KING] + list(whitePieces), [KING] + blackPieces
+                )
+                if isSupported(signature):
+                    signatures.add(signature)
+    return sorted(signatures, key=lambda signature: (
+        len(signature), [-PIECE_LETTERS.index(letter)
+                         for letter in signature if letter != 'v']
+    ))
+
+
+def boardPieces(board: Board) -> list[Piece]:
+    return [
+        (
+            piece.side, KIND_OF_REP[piece.stringRep],
+            piece.position[1] * 8 + piece.position[0],
+        )
+        for piece in board.pieces
+    ]
+
+
+class TableLayout:
+    def __init__(self, signature: str) -> None:
+        if not isSupported(signature):
+            raise ValueError('Unsupported material: %s' % signature)
+        strong, weak = signature.split('v')
+        self.signature = signature
+        self.kinds = [PIECE_LETTERS.index(letter) for letter in strong + weak]
+        self.sides = [WHITE] * len(strong) + [BLACK] * len(weak)
+        self.pieceCount = len(self.kinds)
+        self.sidePieces = {
+            WHITE: list(range(len(strong))),
+            BLACK: list(range(len(strong), self.pieceCount)),
+        }
+        self.kingIndex = {WHITE: 0, BLACK: len(strong)}
+
+        # The white king is moved into a canonical region by a symmetry of
+        # the board, which shrinks the table eight times without pawns and
+        # twice with them.
+        hasPawns = 'P' in signature
+        if hasPawns:
+            self.region = [
+                square for square in range(64) if square % 8 <= 3
+            ]
+            symmetries = SQUARE_MAPS[:2]
+        else:
+            self.region = [
+                square for square in range(64)
+                if square // 8 <= square % 8 <= 3
+            ]
+            symmetries = SQUARE_MAPS
+        self.regionIndex = [-1] * 64
+        for index, square in enumerate(self.region):
+            self.regionIndex[square] = index
+        # A king on the diagonal stays in the region under two symmetries;
+        # the smaller index wins so every position has exactly one key.
+        self.squareMaps = [
+            [
+                squareMap for squareMap in symmetries
+                if self.regionIndex[squareMap[square]] >= 0
+            ]
+            for square in range(64)
+        ]
+        self.size = len(self.region) * 64 ** (self.pieceCount - 1)
+
+    def encode(self, squares: list[int]) -> int:
+        best = -1
+        for squareMap in self.squareMaps[squares[0]]:
+            index = self.regionIndex[squareMap[squares[0]]]
+            for square in squares[1:]:
+                index = index * 64 + squareMap[square]
+            if best < 0 or index < best:
+                best = index
+        return best
+
+    def decode(self, index: int) -> list[int]:
+        squares = [0] * self.pieceCount
+        for position in range(self.pieceCount - 1, 0, -1):
+            squares[position] = index & 63
+            index >>= 6
+        squares[0] = self.region[index]
+        return squares
+
+    def keyOf(self, squares: list[int], whiteToMove: bool) -> int:
+        return self.encode(squares) + (0 if whiteToMove else self.size)
+
+
+class Table:
+    def __init__(
+            self, layout: TableLayout, data: Union[bytearray, mmap.mmap],
+            offset: int = 0
+    ) -> None:
+        self.layout = layout
+        self.data = data
+        self.offset = offset
+
+    def value(self, squares: list[int], whiteToMove: bool) -> int:
+        return self.data[self.offset + self.layout.keyOf(squares, whiteToMove)]
+
+
+class Tablebases:
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self.tables: dict[str, Optional[Table]] = {}
+        self.files: list[IO[bytes]] = []
+
+    def close(self) -> None:
+        for table in self.tables.values():
+            if table is not None and isinstance(table.data, mmap.mmap):
+                table.data.close()
+        for tableFile in self.files:
+            tableFile.close()
+        self.tables.clear()
+        self.files.clear()
+
+    def pathOf(self, signature: str) -> str:
+        return os.path.join(self.directory, signature + '.tb')
+
+    def getTable(self, signature: str) -> Optional[Table]:
+        if signature not in self.tables:
+            self.tables[signature] = self.loadTable(signature)
+        return self.tables[signature]
+
+    def loadTable(self, signature: str) -> Optional[Table]:
+        path = self.pathOf(signature)
+        if not isSupported(signature) or not os.path.exists(path):
+            return None
+        layout = TableLayout(signature)
+        tableFile = open(path, 'rb')
+        data = mmap.mmap(tableFile.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, size = HEADER_FORMAT.unpack_from(data)
+        if (
+                magic != MAGIC or size != layout.size
+                or len(data) != HEADER_FORMAT.size + 2 * size
+        ):
+            data.close()
+            tableFile.close()
+            raise ValueError('Corrupt tablebase file: %s' % path)
+        self.files.append(tableFile)
+        return Table(layout, data, HEADER_FORMAT.size)
+
+    def addTable(self, layout: TableLayout, values: bytearray) -> None:
+        self.tables[layout.signature] = Table(layout, values)
+
+    def probePieces(
+            self, pieces: list[Piece], whiteToMove: bool
+    ) -> Optional[int]:
+        if len(pieces) == 2:
+            (_, _, first), (_, _, second) = pieces
+            return ILLEGAL if KING_ATTACKS[first] >> second & 1 else DRAW
+        signature, flip = canonicalSignature(
+            [kind for side, kind, square in pieces if side],
+            [kind for side, kind, square in pieces if not side],
+        )
+        table = self.getTable(signature)
+        if table is None:
+            return None
+        if flip:
+            pieces = [
+                (not side, kind, square ^ 56) for side, kind, square in pieces
+            ]
+            whiteToMove = not whiteToMove
+        pieces = sorted(pieces, key=lambda piece: (not piece[0], -piece[1]))
+        return table.value(
+            [square for side, kind, square in pieces], whiteToMove
+        )
+
+    def probe(self, board: Board) -> Optional[ProbeResult]:
+        if (
+                len(board.pieces) > MAX_PIECES or board.castlingRights()
+                or board.passantFile() >= 0
+        ):
+            return None
+        value = self.probePieces(boardPieces(board), board.currentSide)
+        if value is None or value == ILLEGAL:
+            return None
+        return resultForValue(value)
+
+    # Winning moves are ranked by the fastest mate, losing ones by the
+    # slowest, so following the table always makes progress. A checkmated or
+    # stalemated position has its result with no moves.
+    def getBestMoves(
+            self, board: Board
+    ) -> Optional[tuple[list[Move], ProbeResult]]:
+        result = self.probe(board)
+        if result is None:
+            return None
+        bestMoves: list[Move] = []
+        bestRank = None
+        for move in board.getAllMovesLegal(board.currentSide):
+            board.makeMove(move)
+            try:
+                childResult = self.probe(board)
+            finally:
+                board.undoLastMove()
+            if childResult is None:
+                return None
+            rank = (-childResult.wdl, childResult.wdl * childResult.plies)
+            if bestRank is None or rank > bestRank:
+                bestRank = rank
+                bestMoves = [move]
+            elif rank == bestRank:
+                bestMoves.append(move)
+        return bestMoves, result
+
+
+class TableGenerator:
+    def __init__(self, layout: TableLayout, tablebases: Tablebases) -> None:
+        self.layout = layout
+        self.tablebases = tablebases
+        self.values = bytearray([UNKNOWN]) * (2 * layout.size)
+        self.buckets: list[list[int]] = [[] for _ in range(MAX_PLIES + 1)]
+
+    def isAttacked(
+            self, squares: list[int], target: int, bySide: bool
+    ) -> bool:
+        kinds = self.layout.kinds
+        occupied = 0
+        for square in squares:
+            occupied |= 1 << square
+        for index in self.layout.sidePieces[bySide]:
+            square = squares[index]
+            kind = kinds[index]
+            if kind == KNIGHT:
+                attacks = KNIGHT_ATTACKS[square]
+            elif kind == KING:
+                attacks = KING_ATTACKS[square]
+            elif kind == PAWN:
+                attacks = PAWN_ATTACKS[bySide][square]
+            elif kind == ROOK:
+                attacks = rookAttacks(square, occupied)
+            elif kind == BISHOP:
+                attacks = bishopAttacks(square, occupied)
+            else:
+                attacks = (
+                    rookAttacks(square, occupied)
+                    | bishopAttacks(square, occupied)
+                )
+            if attacks >> target & 1:
+                return True
+        return False
+
+    def attacksOf(self, kind: int, square: int, occupied: int) -> int:
+        if kind == KNIGHT:
+            return KNIGHT_ATTACKS[square]
+        if kind == KING:
+            return KING_ATTACKS[square]
+        if kind == ROOK:
+            return rookAttacks(square, occupied)
+        if kind == BISHOP:
+            return bishopAttacks(square, occupied)
+        return rookAttacks(square, occupied) | bishopAttacks(square, occupied)
+
+    def isLegalPosition(self, squares: list[int], whiteToMove: bool) -> bool:
+        if len(set(squares)) != len(squares):
+            return False
+        for index, square in enumerate(squares):
+            if self.layout.kinds[index] == PAWN and square // 8 in (0, 7):
+                return False
+        king = squares[self.layout.kingIndex[not whiteToMove]]
+        return not self.isAttacked(squares, king, whiteToMove)
+
+    # Moves are (squares after the move, captured piece index or -1, moving
+    # piece index, promotion kind or -1). They are only pseudo-legal: a move
+    # that leaves the king in check leads to a position marked ILLEGAL, which
+    # is cheaper to look up than to test for.
+    def pseudoLegalMoves(
+            self, squares: list[int], whiteToMove: bool,
+            tacticalOnly: bool = False
+    ) -> list[tuple[list[int], int, int, int]]:
+        kinds = self.layout.kinds
+        occupied = 0
+        own = 0
+        for index, square in enumerate(squares):
+            occupied |= 1 << square
+            if self.layout.sides[index] == whiteToMove:
+                own |= 1 << square
+        moves = []
+        for index in self.layout.sidePieces[whiteToMove]:
+            square = squares[index]
+            kind = kinds[index]
+            if kind == PAWN:
+                forward = 8 if whiteToMove else -8
+                targets = PAWN_ATTACKS[whiteToMove][square] & occupied & ~own
+                if not occupied >> (square + forward) & 1:
+                    if (square + forward) // 8 in (0, 7) or not tacticalOnly:
+                        targets |= 1 << (square + forward)
+                    startRank = 1 if whiteToMove else 6
+                    if (
+                            square // 8 == startRank and not tacticalOnly
+                            and not occupied >> (square + 2 * forward) & 1
+                    ):
+                        targets |= 1 << (square + 2 * forward)
+            else:
+                targets = self.attacksOf(kind, square, occupied) & ~own
+                if tacticalOnly:
+                    targets &= occupied
+            while targets:
+                bit = targets & -targets
+                targets ^= bit
+                target = bit.bit_length() - 1
+                captured = squares.index(target) if occupied & bit else -1
+                newSquares = list(squares)
+                newSquares[index] = target
+                if kind == PAWN and target // 8 in (0, 7):
+                    for promotion in PROMOTION_KINDS:
+                        moves.append((newSquares, captured, index, promotion))
+                else:
+                    moves.append((newSquares, captured, index, -1))
+        return moves
+
+    # Positions one move earlier that lead here without a capture or a
+    # promotion; anything else is looked up in a smaller table instead.
+    def previousPositions(
+            self, squares: list[int], whiteToMove: bool
+    ) -> list[list[int]]:
+        mover = not whiteToMove
+        occupied = 0
+        for square in squares:
+            occupied |= 1 << square
+        positions = []
+        for index in self.layout.sidePieces[mover]:
+            square = squares[index]
+            kind = self.layout.kinds[index]
+            if kind == PAWN:
+                backward = -8 if mover else 8
+                origins = 0
+                origin = square + backward
+                if 8 <= origin < 56 and not occupied >> origin & 1:
+                    origins |= 1 << origin
+                    if (
+                            square // 8 == (3 if mover else 4)
+                            and not occupied >> (origin + backward) & 1
+                    ):
+                        origins |= 1 << (origin + backward)
+            else:
+                origins = self.attacksOf(kind, square, occupied) & ~occupied
+            while origins:
+                bit = origins & -origins
+                origins ^= bit
+                previous = list(squares)
+                previous[index] = bit.bit_length() - 1
+                positions.append(previous)
+        return positions
+
+    def childValue(
+            self, move: tuple[list[int], int, int, int], whiteToMove: bool
+    ) -> int:
+        newSquares, captured, mover, promotion = move
+        if captured < 0 and promotion < 0:
+            return self.values[self.layout.keyOf(newSquares, not whiteToMove)]
+        pieces = []
+        for index, square in enumerate(newSquares):
+            if index == captured:
+                continue
+            kind = self.layout.kinds[index]
+            if index == mover and promotion >= 0:
+                kind = promotion
+            pieces.append((self.layout.sides[index], kind, square))
+        value = self.tablebases.probePieces(pieces, not whiteToMove)
+        if value is None:
+            raise ValueError('Missing tablebase for a child of %s'
+                             % self.layout.signature)
+        return value
+
+    # Returns the plies to mate of the slowest reply when every move loses,
+    # otherwise None.
+    def longestLoss(
+            self, squares: list[int], whiteToMove: bool
+    ) -> Optional[int]:
+        longest = None
+        for move in self.pseudoLegalMoves(squares, whiteToMove):
+            value = self.childValue(move, whiteToMove)
+            if value == ILLEGAL:
+                continue
+            if not isWin(value):
+                return None
+            if longest is None or value - 1 > longest:
+                longest = value - 1
+        return longest
+
+    def initialise(self) -> None:
+        layout = self.layout
+        values = self.values
+        for key in range(2 * layout.size):
+            squares = layout.decode(key % layout.size)
+            if (
+                    layout.encode(squares) != key % layout.size
+                    or not self.isLegalPosition(squares, key < layout.size)
+            ):
+                values[key] = ILLEGAL
+
+        for key in range(2 * layout.size):
+            if values[key] == ILLEGAL:
+                continue
+            whiteToMove = key < layout.size
+            squares = layout.decode(key % layout.size)
+            king = squares[layout.kingIndex[whiteToMove]]
+            inCheck = self.isAttacked(squares, king, not whiteToMove)
+            # Captures and promotions leave the table, so their results are
+            # already known and can seed the search. Outside check nothing
+            # else is needed yet: a stalemate is simply left to end as a draw.
+            hasMove = False
+            fastestWin = None
+            exitsLose = True
+            for move in self.pseudoLegalMoves(
+                    squares, whiteToMove, not inCheck
+            ):
+                value = self.childValue(move, whiteToMove)
+                if value == ILLEGAL:
+                    continue
+                hasMove = True
+                newSquares, captured, mover, promotion = move
+                if captured < 0 and promotion < 0:
+                    exitsLose = False
+                elif isLoss(value):
+                    if fastestWin is None or value < fastestWin:
+                        fastestWin = value
+                elif not isWin(value):
+                    exitsLose = False
+            if not hasMove:
+                if inCheck:
+                    values[key] = 1
+                    self.buckets[0].append(key)
+            elif fastestWin is not None:
+                self.buckets[fastestWin].append(key)
+            elif exitsLose:
+                longest = self.longestLoss(squares, whiteToMove)
+                if longest is not None:
+                    values[key] = longest + 2
+                    self.buckets[longest + 1].append(key)
+
+    def generate(self) -> bytearray:
+        layout = self.layout
+        values = self.values
+        self.initialise()
+        for plies, bucket in enumerate(self.buckets):
+            for key in bucket:
+                value = values[key]
+                if value == UNKNOWN:
+                    values[key] = value = plies + 1
+                if value != plies + 1:
+                    continue
+                whiteToMove = key < layout.size
+                squares = layout.decode(key % layout.size)
+                for previous in self.previousPositions(squares, whiteToMove):
+                    previousKey = layout.keyOf(previous, not whiteToMove)
+                    if values[previousKey] != UNKNOWN:
+                        continue
+                    if isLoss(value):
+                        if plies + 1 > MAX_PLIES:
+                            raise ValueError('Mate too long for %s'
+                                             % layout.signature)
+                        values[previousKey] = plies + 2
+                        self.buckets[plies + 1].append(previousKey)
+                        continue
+                    longest = self.longestLoss(previous, not whiteToMove)
+                    if longest is not None:
+                        values[previousKey] = longest + 2
+                        self.buckets[longest + 1].append(previousKey)
+            bucket.clear()
+        return values.replace(bytes([UNKNOWN]), bytes([DRAW]))
+
+
+def dependencies(signature: str) -> set[str]:
+    strong, weak = signature.split('v')
+    pieces = [(WHITE, PIECE_LETTERS.index(letter)) for letter in strong]
+    pieces += [(BLACK, PIECE_LETTERS.index(letter)) for letter in weak]
+    results = set()
+    for captured in [-1] + list(range(len(pieces))):
+        if captured >= 0 and pieces[captured][1] == KING:
+            continue
+        for promoted in [-1] + list(range(len(pieces))):
+            if promoted == captured:
+                continue
+            if promoted >= 0 and pieces[promoted][1] != PAWN:
+                continue
+            if captured < 0 and promoted < 0:
+                continue
+            for promotion in PROMOTION_KINDS if promoted >= 0 else (-1,):
+                remaining = [
+                    (side, promotion if index == promoted else kind)
+                    for index, (side, kind) in enumerate(pieces)
+                    if index != captured
+                ]
+                if len(remaining) == 2:
+                    continue
+                results.add(canonicalSignature(
+                    [kind for side, kind in remaining if side],
+                    [kind for side, kind in remaining if not side],
+                )[0])
+    return results
+
+
+def writeTable(path: str, values: bytearray) -> None:
+    with open(path, 'wb') as tableFile:
+        tableFile.write(HEADER_FORMAT.pack(MAGIC, len(values) // 2))
+        tableFile.write(values)
+
+
+def generateTables(
+        tablebases: Tablebases, signature: str, verbose: bool = False
+) -> None:
+    if tablebases.getTable(signature) is not None:
+        return
+    for dependency in sorted(dependencies(signature)):
+        generateTables(tablebases, dependency, verbose)
+    layout = TableLayout(signature)
+    start = time.perf_counter()
+    values = TableGenerator(layout, tablebases).generate()
+    writeTable(tablebases.pathOf(signature), values)
+    tablebases.addTable(layout, values)
+    if verbose:
+        longest = max(
+            (value - 1 for value in values
+             if value != DRAW and value < UNKNOWN),
+            default=0,
+        )
+        print('%-6s %9d positions, longest mate %3d plies, %.1fs' % (
+            signature, 2 * layout.size, longest,
+            time.perf_counter() - start,
+        ))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description='Generate or probe endgame tablebases.'
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+    generate = commands.add_parser(
+        'generate', help='build tables and the smaller ones they need'
+    )
+    generate.add_argument('directory')
+    generate.add_argument(
+        'signatures', nargs='*',
+        help='material such as KRvK; defaults to every 3-piece ending'
+    )
+    generate.add_argument(
+        '--pieces', type=int, choices=(3, 4), default=3,
+        help='build every supported ending with this many pieces'
+    )
+    probe = commands.add_parser('probe', help='show the table moves')
+    probe.add_argument('directory')
+    probe.add_argument('--fen', required=True)
+    args = parser.parse_args()
+
+    if args.command == 'generate':
+        os.makedirs(args.directory, exist_ok=True)
+        tablebases = Tablebases(args.directory)
+        try:
+            for signature in args.signatures or allSignatures(args.pieces):
+                generateTables(tablebases, signature, verbose=True)
+        finally:
+            tablebases.close()
+        return
+
+    board = Board(fen=args.fen)
+    tablebases = Tablebases(args.directory)
+    try:
+        found = tablebases.getBestMoves(board)
+    finally:
+        tablebases.close()
+    if found is None:
+        print('position not in the tablebases')
+        sys.exit(1)
+    moves, result = found
+    outcome = {1: 'win', 0: 'draw', -1: 'loss'}[result.wdl]
+    print('%s, %d plies to mate' % (outcome, result.plies)
+          if result.wdl else outcome)
+    if not moves:
+        print('no legal moves')
+    for move in moves:
+        print(board.getCoordinateNotationOfMove(move))
+
+
+if __name__ == '__main__':
+    main()
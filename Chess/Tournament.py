@@ -0,0 +1,364 @@
+from __future__ import annotations
+
+import argparse
+import math
+import os
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    wait,
+)
+from typing import NamedTuple, Optional
+
+from Board import STARTING_FEN, Board
+from Bot import Bot, getWorkerTablebases
+from Evaluation import EVALUATORS
+from OpeningBook import OpeningBook
+from PGN import formatGame
+
+WHITE = True
+BLACK = False
+
+DEFAULT_MAX_PLIES = 300
+CONFIDENCE_Z = 1.96
+
+
+class BotConfig(NamedTuple):
+    name: str
+    depth: int = 3
+    timeLimit: Optional[float] = None
+    nodeLimit: Optional[int] = None
+    evaluation: str = 'tapered'
+    quiescence: bool = True
+    hashSizeMB: float = 16
+    bookPath: Optional[str] = None
+    tablebaseDirectory: Optional[str] = None
+
+
+class GameResult(NamedTuple):
+    number: int
+    firstIsWhite: bool
+    result: str
+    reason: str
+    plies: int
+    nodes: tuple[int, int]
+    seconds: tuple[float, float]
+    pgn: str
+
+
+CONFIG_KEYS = {
+    'name': ('name', str),
+    'depth': ('depth', int),
+    'time': ('timeLimit', float),
+    'nodes': ('nodeLimit', int),
+    'eval': ('evaluation', str),
+    'quiescence': ('quiescence', lambda value: value not in ('0', 'no')),
+    'hash': ('hashSizeMB', float),
+    'book': ('bookPath', str),
+    'tablebases': ('tablebaseDirectory', str),
+}
+
+
+# A configuration is written as comma separated settings, for example
+# "depth=4,eval=material,quiescence=0".
+def parseBotConfig(spec: str) -> BotConfig:
+    settings = {'name': spec}
+    for item in spec.split(','):
+        key, _, value = item.partition('=')
+        if key not in CONFIG_KEYS or not value:
+            raise argparse.ArgumentTypeError(
+                'unknown setting %r; use %s' % (item, ', '.join(CONFIG_KEYS))
+            )
+        field, convert = CONFIG_KEYS[key]
+        try:
+            settings[field] = convert(value)
+        except ValueError:
+            raise argparse.ArgumentTypeError(
+                'bad value for %s: %r' % (key, value)
+            ) from None
+    if settings.get('evaluation', 'tapered') not in EVALUATORS:
+        raise argparse.ArgumentTypeError(
+            'eval must be one of %s' % ', '.join(EVALUATORS)
+        )
+    return BotConfig(**settings)
+
+
+def readOpenings(path: Optional[str]) -> list[str]:
+    if path is None:
+        return [STARTING_FEN]
+    with open(path) as openingsFile:
+        fens = [line.split('#')[0].strip() for line in openingsFile]
+    return [fen for fen in fens if fen]
+
+
+def makeBot(board: Board, side: bool, config: BotConfig) -> Bot:
+    return Bot(
+        board, side, config.depth, hashSizeMB=config.hashSizeMB,
+        timeLimit=config.timeLimit, nodeLimit=config.nodeLimit,
+        evaluate=EVALUATORS[config.evaluation],
+        quiescence=config.quiescence,
+        book=OpeningBook(config.bookPath) if config.bookPath else None,
+        tablebases=getWorkerTablebases(config.tablebaseDirectory),
+    )
+
+
+def adjudicate(
+        board: Board, plies: int, maxPlies: int
+) -> Optional[tuple[str, str]]:
+    if board.isCheckmate():
+        return ('0-1' if board.currentSide == WHITE else '1-0'), 'checkmate'
+    if board.isStalemate():
+        return '1/2-1/2', 'stalemate'
+    if board.noMatingMaterial():
+        return '1/2-1/2', 'insufficient material'
+    if board.isThreefoldRepetition():
+        return '1/2-1/2', 'repetition'
+    if board.isFiftyMoveDraw():
+        return '1/2-1/2', 'fifty moves'
+    if plies >= maxPlies:
+        return '1/2-1/2', 'move limit'
+    return None
+
+
+def playGame(
+        number: int, fen: str, first: BotConfig, second: BotConfig,
+        firstIsWhite: bool, maxPlies: int
+) -> GameResult:
+    board = Board.fromFEN(fen)
+    configs = {WHITE: first, BLACK: second}
+    if not firstIsWhite:
+        configs = {WHITE: second, BLACK: first}
+    bots = {side: makeBot(board, side, configs[side]) for side in configs}
+    nodes = {WHITE: 0, BLACK: 0}
+    seconds = {WHITE: 0.0, BLACK: 0.0}
+    plies = 0
+    try:
+        while True:
+            outcome = adjudicate(board, plies, maxPlies)
+            if outcome is not None:
+                break
+            bot = bots[board.currentSide]
+            nodesBefore = bot.movesAnalyzed
+            start = time.perf_counter()
+            move = bot.getBestMove()
+            seconds[bot.side] += time.perf_counter() - start
+            nodes[bot.side] += bot.movesAnalyzed - nodesBefore
+            board.makeMove(move)
+            plies += 1
+    finally:
+        for bot in bots.values():
+            if bot.book is not None:
+                bot.book.close()
+
+    result, reason = outcome
+    firstSide = WHITE if firstIsWhite else BLACK
+    pgn = formatGame(board, {
+        'Event': 'Self-play', 'Round': str(number),
+        'White': configs[WHITE].name, 'Black': configs[BLACK].name,
+        'Termination': reason,
+    }, result)
+    return GameResult(
+        number, firstIsWhite, result, reason, plies,
+        (nodes[firstSide], nodes[not firstSide]),
+        (seconds[firstSide], seconds[not firstSide]), pgn,
+    )
+
+
+def scoreForFirst(game: GameResult) -> float:
+    if game.result == '1/2-1/2':
+        return 0.5
+    return 1.0 if (game.result == '1-0') == game.firstIsWhite else 0.0
+
+
+def eloFromScore(score: float) -> float:
+    if score <= 0:
+        return -math.inf
+    if score >= 1:
+        return math.inf
+    return 400 * math.log10(score / (1 - score))
+
+
+def scoreFromElo(elo: float) -> float:
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+def getScoreAndVariance(
+        wins: float, draws: float, losses: float
+) -> tuple[float, float]:
+    games = wins + draws + losses
+    score = (wins + draws / 2) / games
+    variance = (
+        wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2
+        + losses * score ** 2
+    ) / games
+    return score, variance
+
+
+# The interval is taken on the mean game score and converted to Elo, so it
+# is lopsided away from an even score.
+def getEloEstimate(
+        wins: int, draws: int, losses: int
+) -> tuple[float, float, float]:
+    score, variance = getScoreAndVariance(wins, draws, losses)
+    margin = CONFIDENCE_Z * math.sqrt(variance / (wins + draws + losses))
+    return (
+        eloFromScore(score), eloFromScore(score - margin),
+        eloFromScore(score + margin),
+    )
+
+
+# Generalised SPRT on the mean score with the normal approximation: the
+# log-likelihood ratio of elo1 against elo0 for the games played so far.
+# Half a win and half a loss are added as a prior, so the variance is never
+# zero when every game so far has ended the same way.
+def getLogLikelihoodRatio(
+        wins: int, draws: int, losses: int, elo0: float, elo1: float
+) -> float:
+    if wins + draws + losses == 0:
+        return 0.0
+    games = wins + draws + losses + 1
+    score, variance = getScoreAndVariance(wins + 0.5, draws, losses + 0.5)
+    score0, score1 = scoreFromElo(elo0), scoreFromElo(elo1)
+    return (
+        games * (score1 - score0) * (2 * score - score0 - score1)
+        / (2 * variance)
+    )
+
+
+def getSprtBounds(alpha: float, beta: float) -> tuple[float, float]:
+    return math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha)
+
+
+def formatGameLine(
+        game: GameResult, wins: int, draws: int, losses: int
+) -> str:
+    return 'game %4d  first %s  %-7s  %-21s  plies %3d  +%d =%d -%d' % (
+        game.number, 'white' if game.firstIsWhite else 'black', game.result,
+        game.reason, game.plies, wins, draws, losses,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description='Play two Bot configurations against each other.'
+    )
+    parser.add_argument(
+        'first', type=parseBotConfig,
+        help='settings such as depth=3,time=0.5,nodes=20000,eval=material,'
+        'quiescence=0,hash=16,book=FILE,tablebases=DIR,name=NAME',
+    )
+    parser.add_argument('second', type=parseBotConfig)
+    parser.add_argument('--games', type=int, default=20)
+    parser.add_argument(
+        '--openings', help='FEN lines to start from, each played twice with '
+        'colours swapped; the initial position by default',
+    )
+    parser.add_argument(
+        '--max-plies', type=int, default=DEFAULT_MAX_PLIES,
+        help='score a game as a draw after this many plies',
+    )
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--pgn', help='append the games to this PGN file')
+    parser.add_argument(
+        '--sprt', type=float, nargs=2, metavar=('ELO0', 'ELO1'),
+        help='stop once a sequential test accepts one of the hypotheses',
+    )
+    parser.add_argument('--alpha', type=float, default=0.05)
+    parser.add_argument('--beta', type=float, default=0.05)
+    args = parser.parse_args()
+
+    openings = readOpenings(args.openings)
+    if not openings:
+        parser.error('no openings in %s' % args.openings)
+    for fen in openings:
+        try:
+            Board.fromFEN(fen)
+        except ValueError as error:
+            parser.error(str(error))
+    workers = max(1, args.workers)
+    bounds = getSprtBounds(args.alpha, args.beta) if args.sprt else None
+    wins = draws = losses = 0
+    nodes = [0, 0]
+    seconds = [0.0, 0.0]
+    llr = 0.0
+    stopped = ''
+    pgnFile = open(args.pgn, 'a') if args.pgn else None
+    pending: set[Future] = set()
+    nextGame = 0
+    start = time.perf_counter()
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        while nextGame < args.games or pending:
+            # Only one game per worker is queued, so an early stop wastes
+            # little.
+            while nextGame < args.games and len(pending) < workers:
+                pending.add(executor.submit(
+                    playGame, nextGame + 1,
+                    openings[(nextGame // 2) % len(openings)],
+                    args.first, args.second, nextGame % 2 == 0,
+                    args.max_plies,
+                ))
+                nextGame += 1
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in sorted(done, key=lambda item: item.result().number):
+                game = future.result()
+                score = scoreForFirst(game)
+                wins += score == 1.0
+                draws += score == 0.5
+                losses += score == 0.0
+                for index in (0, 1):
+                    nodes[index] += game.nodes[index]
+                    seconds[index] += game.seconds[index]
+                if pgnFile is not None:
+                    pgnFile.write(game.pgn + '\n')
+                    pgnFile.flush()
+                print(formatGameLine(game, wins, draws, losses), flush=True)
+            if bounds is not None:
+                llr = getLogLikelihoodRatio(
+                    wins, draws, losses, args.sprt[0], args.sprt[1]
+                )
+                if llr <= bounds[0]:
+                    stopped = 'H0 accepted'
+                elif llr >= bounds[1]:
+                    stopped = 'H1 accepted'
+                if stopped:
+                    break
+    finally:
+        executor.shutdown(cancel_futures=True)
+        if pgnFile is not None:
+            pgnFile.close()
+    elapsed = time.perf_counter() - start
+
+    games = wins + draws + losses
+    print()
+    print('%s vs %s' % (args.first.name, args.second.name))
+    if games == 0:
+        return
+    elo, eloLow, eloHigh = getEloEstimate(wins, draws, losses)
+    print(
+        'games %d  wins %d  draws %d  losses %d  score %.1f%%  time %.1fs'
+        % (
+            games, wins, draws, losses,
+            100 * (wins + draws / 2) / games, elapsed,
+        )
+    )
+    errorBar = math.inf
+    if not (math.isinf(eloLow) or math.isinf(eloHigh)):
+        errorBar = (eloHigh - eloLow) / 2
+    print('elo %+.1f +/- %.1f  95%% interval [%+.1f, %+.1f]' % (
+        elo, errorBar, eloLow, eloHigh
+    ))
+    print('nps  first %.0f  second %.0f' % tuple(
+        nodes[index] / max(seconds[index], 1e-9) for index in (0, 1)
+    ))
+    if bounds is not None:
+        print('sprt  elo0 %g  elo1 %g  llr %.2f  bounds [%.2f, %.2f]  %s' % (
+            args.sprt[0], args.sprt[1], llr, bounds[0], bounds[1],
+            stopped or 'inconclusive',
+        ))
+
+
+if __name__ == '__main__':
+    main()
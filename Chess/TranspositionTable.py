@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import sys
+from typing import NamedTuple, Optional
+
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+
+class TableEntry(NamedTuple):
+    key: int
+    depth: int
+    score: int
+    bound: int
+    moveCode: Optional[int]
+
+
+# Rough footprint of one stored entry: the tuple itself, a 64-bit key object
+# and the list slot pointing at it, plus objects for the score and the 16-bit
+# move code. The interpreter only shares ints from -5 to 256, so those two
+# usually take an object of their own; depth and bound never do.
+ENTRY_BYTES = (
+    sys.getsizeof(TableEntry(2 ** 63, 0, 0, EXACT, None))
+    + sys.getsizeof(2 ** 63)
+    + 2 * sys.getsizeof(2 ** 16)
+    + 8
+)
+# Each bucket holds a depth-preferred and an always-replace slot.
+BUCKET_BYTES = 2 * ENTRY_BYTES
+
+
+class TranspositionTable:
+    def __init__(self, sizeMB: float = 16) -> None:
+        self.sizeMB = sizeMB
+        self.bucketCount = max(1, int(sizeMB * 1024 * 1024) // BUCKET_BYTES)
+        self.clear()
+
+    def clear(self) -> None:
+        self.depthPreferred: list[Optional[TableEntry]] = (
+            [None] * self.bucketCount
+        )
+        self.alwaysReplace: list[Optional[TableEntry]] = (
+            [None] * self.bucketCount
+        )
+        self.hits = 0
+        self.misses = 0
+        self.overwrites = 0
+        self.stores = 0
+
+    def probe(self, key: int) -> Optional[TableEntry]:
+        index = key % self.bucketCount
+        entry = self.depthPreferred[index]
+        if entry is not None and entry.key == key:
+            self.hits += 1
+            return entry
+        entry = self.alwaysReplace[index]
+        if entry is not None and entry.key == key:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def store(
+            self, key: int, depth: int, score: int, bound: int,
+            moveCode: Optional[int]
+    ) -> None:
+        self.stores += 1
+        index = key % self.bucketCount
+        newEntry = TableEntry(key, depth, score, bound, moveCode)
+        entry = self.depthPreferred[index]
+        if entry is None or entry.key == key or depth >= entry.depth:
+            if entry is not None and entry.key != key:
+                self.overwrites += 1
+            self.depthPreferred[index] = newEntry
+            return
+        entry = self.alwaysReplace[index]
+        if entry is not None and entry.key != key:
+            self.overwrites += 1
+        self.alwaysReplace[index] = newEntry
+
+    def usedEntries(self) -> int:
+        return sum(
+            1 for entry in self.depthPreferred + self.alwaysReplace
+            if entry is not None
+        )
+
+    def stats(self) -> dict[str, float]:
+        probes = self.hits + self.misses
+        return {
+            'sizeMB': self.sizeMB,
+            'capacity': 2 * self.bucketCount,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hitRate': self.hits / probes if probes else 0.0,
+            'stores': self.stores,
+            'overwrites': self.overwrites,
+            'used': self.usedEntries(),
+        }
@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+import random
+
+WHITE = True
+BLACK = False
+
+# A fixed seed keeps keys identical across processes, so keys computed by
+# search workers, caches and book files all agree.
+_random = random.Random(0x5EED)
+
+PIECE_KEYS = {
+    side: {
+        stringRep: [_random.getrandbits(64) for _ in range(64)]
+        for stringRep in ('▲', 'N', 'B', 'R', 'Q', 'K')
+    }
+    for side in (WHITE, BLACK)
+}
+BLACK_TO_MOVE_KEY = _random.getrandbits(64)
+CASTLING_KEYS = [0] + [_random.getrandbits(64) for _ in range(15)]
+PASSANT_KEYS = [_random.getrandbits(64) for _ in range(8)]
+
+WHITE_KINGSIDE = 1
+WHITE_QUEENSIDE = 2
+BLACK_KINGSIDE = 4
+BLACK_QUEENSIDE = 8
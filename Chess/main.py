@@ -1,13 +1,22 @@
 from __future__ import annotations
+import os
 import random
 
 from Bot import Bot
 from Board import Board
 from InputParser import InputParser
 from Move import Move
+from OpeningBook import OpeningBook
+from Tablebase import Tablebases
 
 WHITE = True
 BLACK = False
+BOOK_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'book.bin'
+)
+TABLEBASE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'tablebases'
+)
 
 
 def printCommandOptions() -> None:
@@ -26,10 +35,9 @@ def printCommandOptions() -> None:
 
 
 def printAllLegalMoves(board: Board, parser: InputParser) -> None:
-    for move in parser.getLegalMovesWithNotation(
-        board.currentSide, short=True
-    ):
-        print(move.notation)
+    legalMoves = board.getLegalMoves(board.currentSide)
+    for notation in parser.notationsForMoves(legalMoves):
+        print(notation)
 
 
 def getRandomMove(board: Board, parser: InputParser) -> Move:
@@ -68,6 +76,14 @@ def startGame(board: Board, playerSide: bool, bot: Bot) -> None:
             print('Draw')
             return
 
+        if board.isThreefoldRepetition():
+            print('Draw by threefold repetition')
+            return
+
+        if board.isFiftyMoveDraw():
+            print('Draw by the fifty-move rule')
+            return
+
         if board.currentSide == playerSide:
             move = None
             command = input("'?' for options. ")
@@ -93,7 +109,6 @@ def startGame(board: Board, playerSide: bool, bot: Bot) -> None:
         else:
             print('Calculating bot moves...')
             move = bot.getBestMove()
-            move.notation = parser.notationForMove(move)
             makeMove(move, board)
             printBoard(board)
 
@@ -102,14 +117,23 @@ board = Board()
 
 def main() -> None:
     board.isCheckered = False
+    book = OpeningBook(BOOK_PATH) if os.path.exists(BOOK_PATH) else None
+    tablebases = (
+        Tablebases(TABLEBASE_PATH) if os.path.isdir(TABLEBASE_PATH) else None
+    )
     try:
         board.currentSide = WHITE
         print()
-        opponentAI = Bot(board, BLACK, 2)
+        opponentAI = Bot(board, BLACK, 2, book=book, tablebases=tablebases)
         printBoard(board)
         startGame(board, WHITE, opponentAI)
     except KeyboardInterrupt:
         pass
+    finally:
+        if book is not None:
+            book.close()
+        if tablebases is not None:
+            tablebases.close()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+import os
+import random
+import sys
+from typing import Callable
+
+import pytest
+
+# The engine's modules import each other by their flat names.
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'Chess')
+)
+
+from Board import Board  # noqa: E402
+
+
+# Random moves are played from a fixed seed, stopping early if the game
+# ends, so a test sees the same positions on every run.
+@pytest.fixture
+def playRandomMoves() -> Callable[[Board, int, int], None]:
+    def play(board: Board, seed: int, plies: int) -> None:
+        rng = random.Random(seed)
+        for _ in range(plies):
+            moves = board.getLegalMoves(board.currentSide)
+            if not moves:
+                return
+            board.makeMove(rng.choice(moves))
+    return play
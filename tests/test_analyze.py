@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import io
+import json
+
+from Analyze import (
+    SearchLimits, analysePosition, analysePositions, loadFinishedIds,
+    readFenPositions,
+)
+
+LIMITS = SearchLimits(2, None, None, 1, False, None)
+FENS = [
+    'k7/8/1K6/8/8/8/8/7R w - - 0 1',
+    'R6k/8/7K/8/8/8/8/8 b - - 0 1',
+    '4k3/8/8/8/8/8/8/4K3 w - - 0 1',
+]
+
+
+def testFenPositionsAreNamedByLineNumber() -> None:
+    lines = [FENS[0] + '\n', '\n', '# a comment\n', FENS[1] + ' # mated\n']
+    positions = list(readFenPositions(lines))
+    assert [position.id for position in positions] == ['1', '4']
+    assert [position.fen for position in positions] == FENS[:2]
+
+
+def testLoadFinishedIdsCutsOffAPartialRecord(tmp_path) -> None:
+    path = tmp_path / 'results.jsonl'
+    complete = '{"id": "1"}\nnot json\n{"fen": "no id"}\n{"id": "3"}\n'
+    path.write_text(complete + '{"id": "4", "fe')
+    assert loadFinishedIds(str(path)) == {'1', '3'}
+    assert path.read_text() == complete
+
+
+def testAnalysePositionFindsMateAndHandlesGameOver() -> None:
+    positions = list(readFenPositions(FENS[:2]))
+    mateInOne = analysePosition(positions[0], LIMITS)
+    assert mateInOne['bestMove'] == 'Rh8#'
+    assert mateInOne['coordinate'] == 'h1h8'
+    assert mateInOne['mate'] == 1
+    mated = analysePosition(positions[1], LIMITS)
+    assert mated['bestMove'] is None
+    assert mated['mate'] == 0
+
+
+def testResumeSkipsFinishedPositions(tmp_path) -> None:
+    path = tmp_path / 'results.jsonl'
+    path.write_text('{"id": "2"}\n{"id": "3", "fen"')
+    finished = loadFinishedIds(str(path))
+    output = io.StringIO()
+    analysed, skipped = analysePositions(
+        readFenPositions(FENS), LIMITS, 1, output, finished
+    )
+    assert (analysed, skipped) == (2, 1)
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert sorted(record['id'] for record in records) == ['1', '3']
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import pytest
+
+from Board import Board
+from Perft import REFERENCE_POSITIONS
+
+
+def checkSquares(board: Board) -> None:
+    occupied = {piece.position: piece for piece in board.pieces}
+    for y in range(8):
+        for x in range(8):
+            assert board.pieceAtPosition((x, y)) is occupied.get((x, y))
+
+
+@pytest.mark.parametrize(
+    'position', REFERENCE_POSITIONS,
+    ids=[position.name for position in REFERENCE_POSITIONS],
+)
+def testSquareIndexFollowsMovesAndUndo(position, playRandomMoves) -> None:
+    board = Board.fromFEN(position.fen)
+    checkSquares(board)
+    for seed in range(30):
+        playRandomMoves(board, seed, 1)
+        checkSquares(board)
+    while board.history and board.history[-1].key is not None:
+        board.undoLastMove()
+        checkSquares(board)
+    assert board.toFEN() == position.fen
+
+
+@pytest.mark.parametrize(
+    'position', REFERENCE_POSITIONS,
+    ids=[position.name for position in REFERENCE_POSITIONS],
+)
+def testBackendsGenerateTheSameMoves(position, playRandomMoves) -> None:
+    mailbox = Board.fromFEN(position.fen)
+    bitboards = Board.fromFEN(position.fen, useBitboards=True)
+    for seed in range(30):
+        mailboxMoves = sorted(
+            move.code for move in mailbox.getAllMovesLegal(mailbox.currentSide)
+        )
+        bitboardMoves = sorted(
+            move.code
+            for move in bitboards.getAllMovesLegal(bitboards.currentSide)
+        )
+        assert mailboxMoves == bitboardMoves
+        playRandomMoves(mailbox, seed, 1)
+        if len(mailbox.history) == len(bitboards.history):
+            break
+        move = mailbox.history[-1].move
+        bitboards.makeMove(bitboards.getMoveForCode(move.code))
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from Board import STARTING_FEN, Board
+from InputParser import InputParser
+
+
+def play(board: Board, notations: list[str]) -> None:
+    parser = InputParser(board, board.currentSide)
+    for notation in notations:
+        parser.side = board.currentSide
+        board.makeMove(parser.moveForShortAlgebraicNotation(notation))
+
+
+def testThreefoldRepetition() -> None:
+    board = Board.fromFEN(STARTING_FEN)
+    shuffle = ['Nf3', 'Nf6', 'Ng1', 'Ng8']
+    play(board, shuffle)
+    assert board.isRepetition()
+    assert not board.isThreefoldRepetition()
+    play(board, shuffle[:3])
+    assert not board.isThreefoldRepetition()
+    play(board, shuffle[3:])
+    assert board.isThreefoldRepetition()
+    board.undoLastMove()
+    assert not board.isThreefoldRepetition()
+
+
+def testRepetitionNeedsTheSameCastlingRights() -> None:
+    board = Board.fromFEN('r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1')
+    play(board, ['Ke2', 'Ke7', 'Ke1', 'Ke8'])
+    assert not board.isRepetition()
+    play(board, ['Ke2', 'Ke7', 'Ke1', 'Ke8'])
+    assert board.isRepetition()
+
+
+def testFiftyMoveRule() -> None:
+    board = Board.fromFEN('4k3/8/8/8/8/8/4P3/4K3 w - - 98 80')
+    play(board, ['Kd1'])
+    assert not board.isFiftyMoveDraw()
+    play(board, ['Kd7'])
+    assert board.isFiftyMoveDraw()
+    board.undoLastMove()
+    assert not board.isFiftyMoveDraw()
+
+
+def testPawnMoveResetsTheFiftyMoveCount() -> None:
+    board = Board.fromFEN('4k3/8/8/8/8/8/4P3/4K3 w - - 99 80')
+    play(board, ['e4'])
+    assert board.halfmoveClock == 0
+    assert not board.isFiftyMoveDraw()
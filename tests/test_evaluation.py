@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import pytest
+
+from Board import Board
+from Evaluation import WHITE, evaluateFromScratch, evaluateTapered
+from Perft import REFERENCE_POSITIONS
+
+
+def checkEvaluation(board: Board) -> None:
+    for side in (True, False):
+        assert evaluateTapered(board, side) == evaluateFromScratch(board, side)
+        assert board.getPointValueOfSide(side) == sum(
+            piece.value for piece in board.pieces if piece.side == side
+        )
+
+
+# The promotion positions exercise pieces created and removed by promotions
+# and by undoing them.
+@pytest.mark.parametrize(
+    'position', REFERENCE_POSITIONS,
+    ids=[position.name for position in REFERENCE_POSITIONS],
+)
+@pytest.mark.parametrize('useBitboards', [False, True])
+def testIncrementalEvaluationMatchesScratch(
+        position, useBitboards: bool, playRandomMoves
+) -> None:
+    board = Board.fromFEN(position.fen, useBitboards)
+    checkEvaluation(board)
+    for seed in range(40):
+        playRandomMoves(board, seed, 1)
+        checkEvaluation(board)
+    while board.history and board.history[-1].key is not None:
+        board.undoLastMove()
+        checkEvaluation(board)
+
+
+def testEvaluationFavoursTheSideWithMoreMaterial() -> None:
+    board = Board.fromFEN('4k3/8/8/8/8/8/8/3QK3 w - - 0 1')
+    assert evaluateTapered(board, WHITE) > 800
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import pytest
+
+from Board import Board
+from Perft import REFERENCE_POSITIONS
+
+FENS = [position.fen for position in REFERENCE_POSITIONS] + [
+    'rnbqkbnr/pp1ppppp/8/2p5/4P3/5N2/PPPP1PPP/RNBQKB1R b KQkq - 1 2',
+    'rnbqkbnr/ppp1p1pp/8/3pPp2/8/8/PPPP1PPP/RNBQKBNR w KQkq f6 0 3',
+    '4k3/8/8/8/8/8/8/4K2R w K - 12 40',
+]
+
+
+@pytest.mark.parametrize('fen', FENS)
+@pytest.mark.parametrize('useBitboards', [False, True])
+def testFenRoundTrip(fen: str, useBitboards: bool) -> None:
+    board = Board.fromFEN(fen, useBitboards)
+    assert board.toFEN() == fen
+    assert Board.fromFEN(board.toFEN()).zobristKey == board.zobristKey
+
+
+def testFenAfterMoves(playRandomMoves) -> None:
+    board = Board.fromFEN(REFERENCE_POSITIONS[1].fen)
+    playRandomMoves(board, 1, 30)
+    copy = Board.fromFEN(board.toFEN())
+    assert copy.toFEN() == board.toFEN()
+    assert copy.zobristKey == board.zobristKey
+    assert sorted(
+        move.code for move in copy.getLegalMoves(copy.currentSide)
+    ) == sorted(move.code for move in board.getLegalMoves(board.currentSide))
+
+
+def testPassantSquareAllowsTheCapture() -> None:
+    board = Board.fromFEN(FENS[-2])
+    captures = [
+        board.getCoordinateNotationOfMove(move)
+        for move in board.getLegalMoves(board.currentSide)
+        if move.passant
+    ]
+    assert captures == ['e5f6']
+
+
+@pytest.mark.parametrize('fen', [
+    'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq',
+    'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP w KQkq - 0 1',
+    'rnbqkbnr/pppppppp/9/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1',
+    'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR x KQkq - 0 1',
+    'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - a 1',
+])
+def testInvalidFenIsRejected(fen: str) -> None:
+    with pytest.raises(ValueError):
+        Board.fromFEN(fen)
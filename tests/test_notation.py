@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+from typing import Optional
+
+import pytest
+
+from Board import STARTING_FEN, Board
+from InputParser import InputParser
+from Pawn import Pawn
+from Perft import REFERENCE_POSITIONS
+
+
+def parseCoordinates(fen: str, notation: str) -> str:
+    board = Board.fromFEN(fen)
+    move = InputParser(board, board.currentSide).parse(notation)
+    return board.getCoordinateNotationOfMove(move)
+
+
+def parsedCode(parse, notation: str) -> Optional[int]:
+    try:
+        return parse(notation).code
+    except ValueError:
+        return None
+
+
+@pytest.mark.parametrize(
+    'position', REFERENCE_POSITIONS,
+    ids=[position.name for position in REFERENCE_POSITIONS],
+)
+def testCoordinateAndLongAlgebraicNotation(position) -> None:
+    board = Board.fromFEN(position.fen)
+    parser = InputParser(board, board.currentSide)
+    for move in board.getLegalMoves(board.currentSide):
+        coordinate = board.getCoordinateNotationOfMove(move)
+        assert parser.parse(coordinate).code == move.code, coordinate
+        if type(move.piece) is not Pawn:
+            longAlgebraic = move.piece.stringRep + coordinate
+            assert parser.parse(longAlgebraic).code == move.code
+
+
+@pytest.mark.parametrize('fen, notation, coordinate', [
+    (STARTING_FEN, 'e4', 'e2e4'),
+    (STARTING_FEN, 'Nf3', 'g1f3'),
+    (STARTING_FEN, 'Ng1-f3', 'g1f3'),
+    ('r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1', '0-0', 'e1g1'),
+    ('r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1', 'O-O', 'e1g1'),
+    ('r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1', 'O-O-O', 'e1c1'),
+    ('4k3/1P6/8/8/8/8/8/4K3 w - - 0 1', 'b8=Q', 'b7b8Q'),
+    ('4k3/1P6/8/8/8/8/8/4K3 w - - 0 1', 'b8N', 'b7b8N'),
+    ('4k3/8/8/8/8/8/8/1N3NK1 w - - 0 1', 'Nbd2', 'b1d2'),
+    ('4k3/8/8/8/8/8/8/1N3NK1 w - - 0 1', 'Nfd2', 'f1d2'),
+    ('4k3/8/8/R7/8/8/8/R5K1 w - - 0 1', 'R1a3', 'a1a3'),
+    ('4k3/8/8/R7/8/8/8/R5K1 w - - 0 1', 'R5a3', 'a5a3'),
+    (
+        'rnbqkbnr/ppp1pppp/8/3p4/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 2',
+        'exd5', 'e4d5',
+    ),
+    (
+        'rnbqkbnr/ppp1pppp/8/3p4/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 2',
+        'ed', 'e4d5',
+    ),
+])
+def testShortAlgebraicNotation(
+        fen: str, notation: str, coordinate: str
+) -> None:
+    assert parseCoordinates(fen, notation) == coordinate
+    board = Board.fromFEN(fen)
+    parser = InputParser(board, board.currentSide)
+    move = parser.moveForShortAlgebraicNotation(notation)
+    assert board.getCoordinateNotationOfMove(move) == coordinate
+
+
+# A move may name more of its starting square than it needs to, as in
+# Nfxe4 when only one knight can reach e4. Both ways of reading short
+# algebraic notation have to agree on every such form, including a file or
+# rank that is shared with another piece able to make the move.
+@pytest.mark.parametrize(
+    'position', REFERENCE_POSITIONS,
+    ids=[position.name for position in REFERENCE_POSITIONS],
+)
+def testOverDisambiguatedNotation(position, playRandomMoves) -> None:
+    board = Board.fromFEN(position.fen)
+    for _ in range(10):
+        parser = InputParser(board, board.currentSide)
+        for move in board.getLegalMoves(board.currentSide):
+            piece = move.piece
+            if type(piece) is Pawn or move.kingsideCastle:
+                continue
+            if move.queensideCastle:
+                continue
+            oldSquare = board.positionToHumanCoord(move.oldPos)
+            newSquare = board.positionToHumanCoord(move.newPos)
+            capture = 'x' if move.pieceToCapture is not None else ''
+            for start in (oldSquare[0], oldSquare[1], oldSquare):
+                notation = piece.stringRep + start + capture + newSquare
+                code = parsedCode(parser.parse, notation)
+                assert parsedCode(
+                    parser.moveForShortAlgebraicNotation, notation
+                ) == code, notation
+                if start == oldSquare:
+                    assert code == move.code, notation
+                else:
+                    assert code in (move.code, None), notation
+        playRandomMoves(board, board.movesMade, 1)
+
+
+@pytest.mark.parametrize('notation, message', [
+    ('e5', 'Illegal move'),
+    ('Nd2', 'Illegal move'),
+    ('0-0', 'Illegal move'),
+    ('hello', 'Invalid move'),
+    ('z9', 'Invalid move'),
+])
+def testBadInputRaises(notation: str, message: str) -> None:
+    board = Board.fromFEN(STARTING_FEN)
+    parser = InputParser(board, board.currentSide)
+    with pytest.raises(ValueError, match=message):
+        parser.parse(notation)
+    with pytest.raises(ValueError, match=message):
+        parser.moveForShortAlgebraicNotation(notation)
+
+
+def testAmbiguousNotationRaises() -> None:
+    board = Board.fromFEN('4k3/8/8/8/8/8/8/1N3NK1 w - - 0 1')
+    parser = InputParser(board, board.currentSide)
+    with pytest.raises(ValueError):
+        parser.parse('Nd2')
+    with pytest.raises(ValueError):
+        parser.moveForShortAlgebraicNotation('Nd2')
+
+
+def checkNotationsRoundTrip(board: Board) -> None:
+    side = board.currentSide
+    moves = board.getLegalMoves(side)
+    parser = InputParser(board, side)
+    notations = parser.notationsForMoves(moves)
+    assert len(set(notations)) == len(notations)
+    for move, notation in zip(moves, notations):
+        board.makeMove(move)
+        inCheck = board.isInCheck(board.currentSide)
+        mated = inCheck and not board.getLegalMoves(board.currentSide)
+        board.undoLastMove()
+        assert notation.endswith('#') == mated, notation
+        assert notation.endswith('+') == (inCheck and not mated), notation
+        parsed = parser.moveForShortAlgebraicNotation(notation)
+        assert parsed.code == move.code, notation
+
+
+@pytest.mark.parametrize(
+    'position', REFERENCE_POSITIONS,
+    ids=[position.name for position in REFERENCE_POSITIONS],
+)
+@pytest.mark.parametrize('seed', range(3))
+def testSanRoundTrip(position, seed: int, playRandomMoves) -> None:
+    board = Board.fromFEN(position.fen)
+    for _ in range(20):
+        checkNotationsRoundTrip(board)
+        playRandomMoves(board, seed * 100 + board.movesMade, 1)
+
+
+def testCheckAndMateSuffixes() -> None:
+    board = Board.fromFEN(
+        'rnbqkbnr/pppp1ppp/8/4p3/6P1/5P2/PPPPP2P/RNBQKBNR b KQkq g3 0 2'
+    )
+    parser = InputParser(board, board.currentSide)
+    move = parser.moveForShortAlgebraicNotation('Qh4')
+    assert parser.notationForMove(move) == 'Qh4#'
+
+    board = Board.fromFEN('4k3/8/8/8/8/8/8/R3K3 w Q - 0 1')
+    parser = InputParser(board, board.currentSide)
+    move = parser.moveForShortAlgebraicNotation('Ra8')
+    assert parser.notationForMove(move) == 'Ra8+'
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import random
+
+from Board import STARTING_FEN, Board
+from InputParser import InputParser
+from OpeningBook import OpeningBook, buildBookEntries, writeBook
+
+LINES = [
+    'e4 e5 Nf3 Nc6',
+    'e4 c5 # a comment',
+    'e4 e5 Nf3 Nf6',
+    'd4 d5',
+    '',
+]
+
+
+def notationsOf(board: Board, moves) -> dict[str, int]:
+    parser = InputParser(board, board.currentSide)
+    return {parser.notationForMove(move): weight for move, weight in moves}
+
+
+def testBookLookup(tmp_path) -> None:
+    path = str(tmp_path / 'book.bin')
+    assert writeBook(path, buildBookEntries(LINES)) == 8
+    book = OpeningBook(path)
+    try:
+        board = Board.fromFEN(STARTING_FEN)
+        assert notationsOf(board, book.getMoves(board)) == {'e4': 3, 'd4': 1}
+
+        parser = InputParser(board, board.currentSide)
+        board.makeMove(parser.moveForShortAlgebraicNotation('e4'))
+        assert notationsOf(board, book.getMoves(board)) == {'e5': 2, 'c5': 1}
+
+        parser.side = board.currentSide
+        board.makeMove(parser.moveForShortAlgebraicNotation('c5'))
+        assert book.getMoves(board) == []
+        assert book.chooseMove(board) is None
+    finally:
+        book.close()
+
+
+def testChosenMovesFollowTheWeights(tmp_path) -> None:
+    path = str(tmp_path / 'book.bin')
+    writeBook(path, buildBookEntries(LINES))
+    book = OpeningBook(path)
+    try:
+        board = Board.fromFEN(STARTING_FEN)
+        rng = random.Random(1)
+        chosen = [
+            board.getCoordinateNotationOfMove(book.chooseMove(board, rng))
+            for _ in range(400)
+        ]
+    finally:
+        book.close()
+    assert set(chosen) == {'e2e4', 'd2d4'}
+    assert chosen.count('e2e4') > 2 * chosen.count('d2d4')
+
+
+def testEmptyBookHasNoMoves(tmp_path) -> None:
+    path = tmp_path / 'empty.bin'
+    path.write_bytes(b'')
+    book = OpeningBook(str(path))
+    try:
+        assert book.getMoves(Board.fromFEN(STARTING_FEN)) == []
+    finally:
+        book.close()
@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+import pytest
+
+from Board import Board
+from Perft import REFERENCE_POSITIONS, perft
+
+# Depths whose node counts stay small enough to run on every change.
+MAX_NODES = 10000
+
+CASES = [
+    (position, depth + 1)
+    for position in REFERENCE_POSITIONS
+    for depth, nodes in enumerate(position.nodes)
+    if nodes <= MAX_NODES
+]
+
+
+@pytest.mark.parametrize(
+    'position,depth', CASES,
+    ids=['%s-%d' % (position.name, depth) for position, depth in CASES],
+)
+@pytest.mark.parametrize('useBitboards', [False, True])
+def testReferenceNodeCounts(position, depth: int, useBitboards: bool) -> None:
+    board = Board.fromFEN(position.fen, useBitboards)
+    assert perft(board, depth) == position.nodes[depth - 1]
+    assert board.toFEN() == position.fen
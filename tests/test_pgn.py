@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import pytest
+
+from Board import STARTING_FEN, Board
+from PGN import formatGame, readGames, replayGame
+from Perft import REFERENCE_POSITIONS
+
+
+@pytest.mark.parametrize('fen', [STARTING_FEN, REFERENCE_POSITIONS[3].fen])
+@pytest.mark.parametrize('seed', range(3))
+def testWriteReadWrite(fen: str, seed: int, playRandomMoves) -> None:
+    board = Board.fromFEN(fen)
+    playRandomMoves(board, seed, 80)
+    headers = {'Event': 'Test "quoted" \\ event', 'Annotator': 'tests'}
+    text = formatGame(board, headers)
+
+    games = list(readGames(text.splitlines(keepends=True)))
+    assert len(games) == 1
+    game = games[0]
+    assert game.headers['Event'] == headers['Event']
+    replayed = replayGame(game)
+    assert replayed.toFEN() == board.toFEN()
+    assert formatGame(replayed, game.headers, game.result) == text
+
+
+def testCommentsAndVariationsAreSkipped() -> None:
+    text = (
+        '[Event "?"]\n\n1. e4 {best by test} e5 (1... c5 2. Nf3) 2. Nf3 $1\n'
+        '; a comment to the end of the line\nNc6 *\n'
+    )
+    game, = readGames(text.splitlines(keepends=True))
+    assert game.moves == ['e4', 'e5', 'Nf3', 'Nc6']
+    assert game.result == '*'
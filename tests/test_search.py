@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import pytest
+
+from Board import Board
+from Bot import Bot
+from InputParser import InputParser
+from Perft import REFERENCE_POSITIONS
+
+DEPTH = 3
+POSITIONS = REFERENCE_POSITIONS[:4]
+# Every process checks the budget once every 256 nodes and reports to the
+# shared count when it does, so each worker may run up to twice that over.
+NODE_CHECK_INTERVAL = 256
+
+
+def searchBestMoves(board: Board, workers: int) -> tuple[set[int], int]:
+    bot = Bot(board, board.currentSide, DEPTH, workers=workers)
+    try:
+        bestMoves = bot.getBestMoves(maxDepth=DEPTH)
+    finally:
+        bot.close()
+    return {move.code for move in bestMoves}, bot.bestScore
+
+
+@pytest.mark.parametrize(
+    'fen', [position.fen for position in POSITIONS],
+    ids=[position.name for position in POSITIONS],
+)
+def testParallelSearchMatchesSequential(fen: str) -> None:
+    assert (
+        searchBestMoves(Board.fromFEN(fen), 2)
+        == searchBestMoves(Board.fromFEN(fen), 1)
+    )
+
+
+@pytest.mark.parametrize('nodeLimit', [3000, 8000])
+def testParallelSearchSharesTheNodeBudget(nodeLimit: int) -> None:
+    workers = 2
+    board = Board.fromFEN(REFERENCE_POSITIONS[3].fen)
+    bot = Bot(board, board.currentSide, 20, workers=workers)
+    try:
+        bestMoves = bot.getBestMoves(nodeLimit=nodeLimit)
+    finally:
+        bot.close()
+    assert bestMoves
+    assert bot.completedDepth >= 2
+    assert bot.movesAnalyzed <= (
+        nodeLimit + 2 * NODE_CHECK_INTERVAL * workers
+    )
+    assert bot.principalVariation[0].code in {move.code for move in bestMoves}
+
+
+# Black can draw by going back to e8, which the workers only see if they
+# are given the moves played so far.
+def testParallelSearchSeesRepetitions() -> None:
+    board = Board.fromFEN('4k3/8/8/8/8/8/8/Q3K3 w - - 0 1')
+    parser = InputParser(board, board.currentSide)
+    for notation in ['Kd1', 'Kd8', 'Ke1', 'Ke8', 'Kd1']:
+        parser.side = board.currentSide
+        board.makeMove(parser.moveForShortAlgebraicNotation(notation))
+    sequential = searchBestMoves(board, 1)
+    assert sequential[1] == 0
+    assert searchBestMoves(board, 2) == sequential
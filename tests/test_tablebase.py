@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from Board import Board
+from Tablebase import ProbeResult, Tablebases, generateTables
+
+FILES = 'abcdefgh'
+
+
+@pytest.fixture(scope='module')
+def tablebases(tmp_path_factory):
+    tablebases = Tablebases(str(tmp_path_factory.mktemp('tablebases')))
+    generateTables(tablebases, 'KRvK')
+    yield tablebases
+    tablebases.close()
+
+
+def testMateInOne(tablebases) -> None:
+    board = Board.fromFEN('k7/8/1K6/8/8/8/8/7R w - - 0 1')
+    moves, result = tablebases.getBestMoves(board)
+    assert result == ProbeResult(1, 1)
+    assert [board.getCoordinateNotationOfMove(move) for move in moves] == [
+        'h1h8'
+    ]
+
+
+def testPositionsWithoutLegalMoves(tablebases) -> None:
+    mated = Board.fromFEN('R6k/8/7K/8/8/8/8/8 b - - 0 1')
+    assert tablebases.getBestMoves(mated) == ([], ProbeResult(-1, 0))
+    stalemated = Board.fromFEN('k1K5/1R6/8/8/8/8/8/8 b - - 0 1')
+    assert tablebases.getBestMoves(stalemated) == ([], ProbeResult(0, 0))
+
+
+def testMissingTableIsNotProbed(tablebases) -> None:
+    board = Board.fromFEN('k7/8/1K6/8/8/8/8/7Q w - - 0 1')
+    assert tablebases.probe(board) is None
+    assert tablebases.getBestMoves(board) is None
+
+
+def randomPositions(count: int):
+    rng = random.Random(7)
+    while count:
+        squares = rng.sample(range(64), 3)
+        placement = {
+            square: letter for square, letter in zip(squares, 'KRk')
+        }
+        rows = []
+        for y in range(7, -1, -1):
+            row = ''
+            empty = 0
+            for x in range(8):
+                letter = placement.get(y * 8 + x)
+                if letter is None:
+                    empty += 1
+                    continue
+                row += (str(empty) if empty else '') + letter
+                empty = 0
+            rows.append(row + (str(empty) if empty else ''))
+        side = rng.choice('wb')
+        yield Board.fromFEN('/'.join(rows) + ' %s - - 0 1' % side)
+        count -= 1
+
+
+# Every result must follow from the results of the positions one move on:
+# a win is one ply longer than the fastest win, a loss one ply longer than
+# the slowest loss, and a draw has no winning move.
+def testResultsAgreeWithTheMovesFromEachPosition(tablebases) -> None:
+    checked = 0
+    for board in randomPositions(300):
+        result = tablebases.probe(board)
+        if result is None:
+            continue
+        children = []
+        for move in board.getLegalMoves(board.currentSide):
+            board.makeMove(move)
+            children.append(tablebases.probe(board))
+            board.undoLastMove()
+        if not children:
+            continue
+        if result.wdl > 0:
+            assert result.plies == 1 + min(
+                child.plies for child in children if child.wdl < 0
+            )
+        elif result.wdl < 0:
+            assert all(child.wdl > 0 for child in children)
+            assert result.plies == 1 + max(child.plies for child in children)
+        else:
+            assert all(child.wdl >= 0 for child in children)
+            assert any(child.wdl == 0 for child in children)
+        checked += 1
+    assert checked > 150
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import math
+
+import pytest
+
+from Tournament import (
+    GameResult, eloFromScore, getEloEstimate, getLogLikelihoodRatio,
+    getSprtBounds, scoreForFirst, scoreFromElo,
+)
+
+
+def makeResult(firstIsWhite: bool, result: str) -> GameResult:
+    return GameResult(1, firstIsWhite, result, '', 0, (0, 0), (0, 0), '')
+
+
+def testEloFromScore() -> None:
+    assert eloFromScore(0.5) == 0
+    assert eloFromScore(0.75) == pytest.approx(190.85, abs=0.01)
+    assert eloFromScore(0.25) == pytest.approx(-190.85, abs=0.01)
+    assert eloFromScore(0) == -math.inf
+    assert eloFromScore(1) == math.inf
+
+
+@pytest.mark.parametrize('elo', [-400, -35, 0, 5, 120])
+def testScoreFromEloIsTheInverse(elo: float) -> None:
+    assert eloFromScore(scoreFromElo(elo)) == pytest.approx(elo)
+
+
+@pytest.mark.parametrize('firstIsWhite, result, score', [
+    (True, '1-0', 1.0),
+    (False, '1-0', 0.0),
+    (True, '0-1', 0.0),
+    (False, '0-1', 1.0),
+    (True, '1/2-1/2', 0.5),
+    (False, '1/2-1/2', 0.5),
+])
+def testScoreForFirst(firstIsWhite: bool, result: str, score: float) -> None:
+    assert scoreForFirst(makeResult(firstIsWhite, result)) == score
+
+
+def testEloEstimate() -> None:
+    elo, low, high = getEloEstimate(60, 20, 20)
+    assert low < elo < high
+    assert elo == pytest.approx(eloFromScore(0.7))
+    assert getEloEstimate(30, 40, 30)[0] == 0
+    narrow = getEloEstimate(600, 200, 200)
+    assert narrow[2] - narrow[1] < high - low
+
+
+def testLogLikelihoodRatio() -> None:
+    lower, upper = getSprtBounds(0.05, 0.05)
+    assert lower == pytest.approx(-2.944, abs=0.001)
+    assert upper == pytest.approx(2.944, abs=0.001)
+    assert getLogLikelihoodRatio(0, 0, 0, 0, 10) == 0
+    assert getLogLikelihoodRatio(1000, 3000, 1000, 0, 10) < lower
+    assert getLogLikelihoodRatio(600, 1000, 400, 0, 10) > upper
+    assert getLogLikelihoodRatio(5, 0, 0, 0, 10) > 0
+    assert getLogLikelihoodRatio(0, 0, 5, 0, 10) < 0
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import pytest
+
+from Board import STARTING_FEN, Board
+from InputParser import InputParser
+from Perft import REFERENCE_POSITIONS
+
+
+@pytest.mark.parametrize(
+    'position', REFERENCE_POSITIONS,
+    ids=[position.name for position in REFERENCE_POSITIONS],
+)
+@pytest.mark.parametrize('useBitboards', [False, True])
+def testIncrementalKeyMatchesRecompute(
+        position, useBitboards: bool, playRandomMoves
+) -> None:
+    board = Board.fromFEN(position.fen, useBitboards)
+    keys = [board.zobristKey]
+    for seed in range(40):
+        playRandomMoves(board, seed, 1)
+        if len(board.history) < len(keys):
+            break
+        assert board.zobristKey == board.computeZobristKey()
+        keys.append(board.zobristKey)
+    while len(keys) > 1:
+        board.undoLastMove()
+        keys.pop()
+        assert board.zobristKey == board.computeZobristKey() == keys[-1]
+
+
+def play(board: Board, notations: list[str]) -> None:
+    parser = InputParser(board, board.currentSide)
+    for notation in notations:
+        parser.side = board.currentSide
+        board.makeMove(parser.moveForShortAlgebraicNotation(notation))
+
+
+def testTranspositionsShareAKey() -> None:
+    first = Board.fromFEN(STARTING_FEN)
+    play(first, ['Nf3', 'Nf6', 'd4', 'd5'])
+    second = Board.fromFEN(STARTING_FEN)
+    play(second, ['d4', 'd5', 'Nf3', 'Nf6'])
+    assert first.zobristKey == second.zobristKey
+    assert first.zobristKey == Board.fromFEN(first.toFEN()).zobristKey
+
+
+def testStateChangesTheKey() -> None:
+    fen = 'r3k2r/8/8/3pP3/8/8/8/R3K2R w KQkq d6 0 2'
+    withoutPassant = fen.replace('d6', '-')
+    fens = [
+        fen,
+        withoutPassant,
+        withoutPassant.replace(' w ', ' b '),
+        withoutPassant.replace('KQkq', 'Qkq'),
+    ]
+    assert len({Board.fromFEN(fen).zobristKey for fen in fens}) == len(fens)